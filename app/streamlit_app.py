@@ -4,9 +4,48 @@ from digest_simulator.DigestionSimulator import DigestionSimulator  # assuming t
 from digest_simulator.ProteasePredictor import ProteasePredictor
 
 from digest_simulator.proteases import available_proteases
+from digest_simulator.coverage import coverage_image
 
 st.set_page_config(layout="wide")
 
+# The tree view shows at most this many lines, so large digests are not drawn in full
+MAX_TREE_LINES = 2000
+
+
+@st.cache_resource(max_entries=8)
+def get_simulator(sequence, protease_names, min_peptide_length):
+    """Digests the sequence once per (sequence, sorted protease names, min_peptide_length)."""
+    proteases = [available_proteases[name]() for name in protease_names]
+    return DigestionSimulator(sequence, proteases, min_peptide_length=min_peptide_length)
+
+
+@st.cache_data(max_entries=32)
+def digest(sequence, protease_names, min_peptide_length):
+    simulator = get_simulator(sequence, protease_names, min_peptide_length)
+    starts, ends = simulator.peptide_coverage()
+    return sorted(simulator.extract_unique_peptide_sequences(), key=len), starts, ends
+
+
+@st.cache_data(max_entries=32)
+def tree_lines(sequence, protease_names, min_peptide_length, max_lines):
+    """Formats only the first max_lines lines of the tree, plus one to tell if it was cut."""
+    simulator = get_simulator(sequence, protease_names, min_peptide_length)
+    return list(simulator.iter_tree_lines(max_lines=max_lines + 1))
+
+
+@st.cache_resource(max_entries=8)
+def get_predictor(sequence, protease_names, min_peptide_length):
+    """Keeps one predictor, and with it the cleavage site masks, per digest key."""
+    proteases = [available_proteases[name]() for name in protease_names]
+    return ProteasePredictor(sequence, proteases, min_peptide_length=min_peptide_length)
+
+
+@st.cache_data(max_entries=64)
+def predict(sequence, protease_names, min_peptide_length, observed_sequences):
+    predictor = get_predictor(sequence, protease_names, min_peptide_length)
+    return predictor.predict(list(observed_sequences))
+
+
 # Use the write function for basic output
 st.title('Protein Digestion Simulator')
 
@@ -25,20 +64,30 @@ min_peptide_length = st.slider('Minimum peptide length:', min_value=0, max_value
 if sequence and selected_proteases:
 
     st.header('Digestion prediction')    
-    # Map the names of the selected proteases to their instances
-    selected_protease_instances = [available_proteases[protease]() for protease in selected_proteases]
+    # Sorted names make the cache key independent of the selection order
+    protease_names = tuple(sorted(selected_proteases))
 
-    simulator = DigestionSimulator(sequence, selected_protease_instances, min_peptide_length=min_peptide_length)
+    unique_peptide_sequences, starts, ends = digest(sequence, protease_names,
+                                                    min_peptide_length)
 
     # Display the peptide tree
     st.subheader('Peptide Tree')
-    
-    st.text(simulator.draw_tree().replace(' ', '-'))
-
-    # Extract and display unique peptide sequences
+    view = st.radio('Display as', ['Tree', 'Coverage heatmap'], horizontal=True)
+
+    if view == 'Tree':
+        lines = tree_lines(sequence, protease_names, min_peptide_length, MAX_TREE_LINES)
+        st.text('\n'.join(lines[:MAX_TREE_LINES]).replace(' ', '-'))
+        if len(lines) > MAX_TREE_LINES:
+            st.caption(f'Showing the first {MAX_TREE_LINES} lines; '
+                       'switch to the coverage heatmap to see all peptides.')
+    else:
+        st.image(coverage_image(starts, ends, len(sequence)),
+                 caption=f'{len(starts)} peptides (rows) over '
+                         f'{len(sequence)} residues (columns)')
+
+    # Display unique peptide sequences
     st.subheader('Predicted (unique) peptide sequences.')
-    simulator.extract_unique_peptide_sequences()
-    st.text('\n'.join(sorted(simulator.unique_peptide_sequences, key=len)))
+    st.text('\n'.join(unique_peptide_sequences))
 
     st.header('Predict proteases')
     # Input field for user to add their own sequences
@@ -49,8 +98,7 @@ if sequence and selected_proteases:
     if user_sequences:
         # convert the user input into a list of sequences
         user_sequences = user_sequences.split('\n')
-        pp = ProteasePredictor(sequence, selected_protease_instances)
-        df = pp.predict(user_sequences)
+        df = predict(sequence, protease_names, min_peptide_length, tuple(user_sequences))
         df['Probabilty [%]'] = df['Score'] * 100
         df = df.sort_values('Probabilty [%]', ascending=False).reset_index(drop=True)
         df.drop('Score', axis=1, inplace=True)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Benchmarks node-creation throughput of generate_peptide_tree.
+
+Compares the list-based deduplication of earlier versions with the hashed set used
+now, on random sequences sized to yield roughly 10^3 to 10^5 peptides.
+
+Usage:
+    python benchmarks/bench_peptide_tree.py [--sizes 1000 10000 100000] [--list-max 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from digest_simulator.PeptideNode import PeptideNode
+from digest_simulator.proteases import Trypsin, Chymotrypsin
+from digest_simulator.tools import generate_peptide_tree
+
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+# Trypsin + Chymotrypsin yield about one distinct peptide per four random residues.
+RESIDUES_PER_PEPTIDE = 4
+
+
+class ListDedup(list):
+    """The linear-scan list used for deduplication before the hashed set."""
+    add = list.append
+
+
+def random_sequence(length, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice(AMINO_ACIDS) for _ in range(length))
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += len(node.children)
+        stack.extend(node.children)
+    return count
+
+
+def time_tree(sequence, proteases, peptides_added):
+    root = PeptideNode(sequence)
+    start = time.perf_counter()
+    generate_peptide_tree(root, proteases, 0, max_depth=100, min_length=0,
+                          peptides_added=peptides_added)
+    return count_nodes(root), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Approximate number of peptides per synthetic sequence.')
+    parser.add_argument('--list-max', type=int, default=20000,
+                        help='Skip the quadratic list baseline above this size.')
+    args = parser.parse_args()
+
+    proteases = [Trypsin(), Chymotrypsin()]
+    print(f"{'peptides':>10} {'nodes':>10} {'list [nodes/s]':>16} {'set [nodes/s]':>16} "
+          f"{'speedup':>8}")
+    for size in args.sizes:
+        sequence = random_sequence(size * RESIDUES_PER_PEPTIDE)
+        nodes, set_time = time_tree(sequence, proteases, set())
+        set_rate = nodes / set_time
+        if size <= args.list_max:
+            _, list_time = time_tree(sequence, proteases, ListDedup())
+            list_rate = nodes / list_time
+            print(f"{size:>10} {nodes:>10} {list_rate:>16.0f} {set_rate:>16.0f} "
+                  f"{list_time / set_time:>7.1f}x")
+        else:
+            print(f"{size:>10} {nodes:>10} {'skipped':>16} {set_rate:>16.0f} {'-':>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Benchmarks the memory of a peptide tree of PeptideNode objects against a PeptideTree.
+
+Both trees are built from the same random sequences, sized to yield roughly 10^3 to
+10^5 nodes, and measured with tracemalloc.
+
+Usage:
+    python benchmarks/bench_tree_memory.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from digest_simulator.PeptideNode import PeptideNode
+from digest_simulator.PeptideTree import build_peptide_tree
+from digest_simulator.proteases import Trypsin, Chymotrypsin
+from digest_simulator.tools import generate_peptide_tree_iterative
+
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+# Trypsin + Chymotrypsin yield about one distinct peptide per four random residues.
+RESIDUES_PER_PEPTIDE = 4
+
+
+def random_sequence(length, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice(AMINO_ACIDS) for _ in range(length))
+
+
+def object_tree(sequence, proteases):
+    root = PeptideNode(sequence, start=0)
+    generate_peptide_tree_iterative(root, proteases, max_depth=100)
+    return root
+
+
+def compact_tree(sequence, proteases):
+    return build_peptide_tree(sequence, proteases, max_depth=100)
+
+
+def measure(build, sequence, proteases):
+    """Returns the tree, the bytes it retains and the build time."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = build(sequence, proteases)
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tree, retained, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Approximate number of nodes per synthetic sequence.')
+    args = parser.parse_args()
+
+    proteases = [Trypsin(), Chymotrypsin()]
+    print(f"{'nodes':>10} {'objects [MB]':>13} {'arrays [MB]':>12} {'ratio':>7} "
+          f"{'objects [s]':>12} {'arrays [s]':>11}")
+    for size in args.sizes:
+        sequence = random_sequence(size * RESIDUES_PER_PEPTIDE)
+        _, object_bytes, object_time = measure(object_tree, sequence, proteases)
+        tree, array_bytes, array_time = measure(compact_tree, sequence, proteases)
+        print(f"{len(tree):>10} {object_bytes / 2**20:>13.2f} {array_bytes / 2**20:>12.2f} "
+              f"{object_bytes / array_bytes:>6.1f}x {object_time:>12.2f} {array_time:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+from collections import deque
+
+
+class AhoCorasick:
+    def __init__(self, patterns):
+        """
+        This class represents an Aho-Corasick automaton over a set of peptides.
+
+        The automaton is compiled once and then finds all peptides, including overlapping
+        ones, in a single pass over each sequence. A scan costs time linear in the length
+        of the sequence plus the number of hits.
+
+        Parameters
+        ----------
+        patterns : iterable of str
+            The peptides to search for. Duplicates and empty strings are ignored.
+        """
+        self.patterns = sorted({pattern for pattern in patterns if pattern})
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.output_link = [0]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for residue in pattern:
+                next_state = self.goto[state].get(residue)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][residue] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.output_link.append(0)
+                state = next_state
+            self.output[state].append(pattern_id)
+
+        self._link()
+
+    def _link(self):
+        """Sets the failure and output links of every state, breadth first."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for residue, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and residue not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(residue, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                fail_state = self.fail[next_state]
+                if self.output[fail_state]:
+                    self.output_link[next_state] = fail_state
+                else:
+                    self.output_link[next_state] = self.output_link[fail_state]
+
+    def iter_matches(self, sequence):
+        """
+        Finds all occurrences of the patterns in the given sequence.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to scan.
+
+        Yields
+        ------
+        tuple of str and int
+            The peptide and the offset of each occurrence, in order of the end position.
+        """
+        goto, fail, output, output_link = self.goto, self.fail, self.output, self.output_link
+        patterns = self.patterns
+        state = 0
+        for i, residue in enumerate(sequence):
+            while state and residue not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(residue, 0)
+            match_state = state if output[state] else output_link[state]
+            while match_state:
+                for pattern_id in output[match_state]:
+                    pattern = patterns[pattern_id]
+                    yield pattern, i - len(pattern) + 1
+                match_state = output_link[match_state]
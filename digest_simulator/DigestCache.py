@@ -0,0 +1,223 @@
+import hashlib
+import sys
+import threading
+
+from collections import OrderedDict
+
+
+def digest_method(engine='tree', traversal='recursive', max_missed_cleavages=None):
+    """
+    Names the method of a DigestionSimulator for digest_key.
+
+    Parameters
+    ----------
+    engine : str, optional
+        The DigestionSimulator engine. The default is 'tree'.
+    traversal : str, optional
+        The DigestionSimulator traversal. The default is 'recursive'.
+    max_missed_cleavages : int, optional
+        The DigestionSimulator max_missed_cleavages. The default is None.
+
+    Returns
+    -------
+    str
+        'missed_cleavages:<k>', 'interval', 'dag', 'tree' or 'tree:breadth_first'. The
+        depth-first traversal builds the same tree as the recursion, so both are named 'tree'.
+    """
+    if max_missed_cleavages is not None:
+        return f'missed_cleavages:{max_missed_cleavages}'
+    if engine in ('interval', 'dag'):
+        return engine
+    if traversal == 'breadth_first':
+        return 'tree:breadth_first'
+    return 'tree'
+
+
+def digest_key(sequence, proteases, min_peptide_length, max_depth=None, method='interval'):
+    """
+    Computes a stable hash that identifies a digest.
+
+    Parameters
+    ----------
+    sequence : str
+        The digested sequence.
+    proteases : list of Protease
+        The proteases of the digest, identified by Protease.definition.
+    min_peptide_length : int
+        The minimum peptide length of the digest.
+    max_depth : int, optional
+        The maximum depth of the peptide tree. The default is None.
+    method : str, optional
+        How the peptides were generated, see digest_method. Only the tree methods depend
+        on the order of the proteases and the 'dag' and tree methods on max_depth, so these
+        are normalized away for the other methods. The default is 'interval'.
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-256 digest of the parameters.
+    """
+    definitions = [protease.definition() for protease in proteases]
+    if not method.startswith('tree'):
+        definitions = sorted(definitions)
+    if method == 'interval' or method.startswith('missed_cleavages'):
+        max_depth = None
+    parameters = repr((definitions, min_peptide_length, max_depth, method))
+    h = hashlib.sha256(sequence.encode())
+    h.update(parameters.encode())
+    return h.hexdigest()
+
+
+def approximate_size(peptides):
+    """
+    Approximates the memory used by a set of peptides in bytes.
+
+    Parameters
+    ----------
+    peptides : frozenset of str
+        The peptides.
+
+    Returns
+    -------
+    int
+        The size of the set and of all its strings.
+    """
+    return sys.getsizeof(peptides) + sum(sys.getsizeof(peptide) for peptide in peptides)
+
+
+class DigestCache:
+    def __init__(self, max_entries=1024, max_bytes=256 * 2**20):
+        """
+        This class represents a thread-safe LRU cache of peptide sets.
+
+        The least recently used digests are evicted when the cache holds more than
+        max_entries digests or more than max_bytes approximate bytes.
+
+        Parameters
+        ----------
+        max_entries : int, optional
+            The maximum number of cached digests. The default is 1024.
+        max_bytes : int, optional
+            The maximum approximate size of all cached digests. The default is 256 MiB.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """
+        Returns the cached peptides of a digest and marks it as recently used.
+
+        Parameters
+        ----------
+        key : str
+            The digest key, see digest_key.
+
+        Returns
+        -------
+        frozenset of str or None
+            The cached peptides, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, peptides):
+        """
+        Stores the peptides of a digest, evicting the least recently used digests if needed.
+
+        A digest larger than max_bytes on its own is not stored.
+
+        Parameters
+        ----------
+        key : str
+            The digest key, see digest_key.
+        peptides : iterable of str
+            The peptides of the digest.
+
+        Returns
+        -------
+        frozenset of str
+            The stored peptides.
+        """
+        peptides = frozenset(peptides)
+        size = approximate_size(peptides)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return peptides
+            self._entries[key] = (peptides, size)
+            self.current_bytes += size
+            self._evict()
+        return peptides
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self.current_bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def resize(self, max_entries=None, max_bytes=None):
+        """
+        Changes the limits of the cache and evicts digests until they are met.
+
+        Parameters
+        ----------
+        max_entries : int, optional
+            The new maximum number of cached digests. The default is None, which keeps it.
+        max_bytes : int, optional
+            The new maximum approximate size. The default is None, which keeps it.
+        """
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Removes all digests and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the counters of the cache.
+
+        Returns
+        -------
+        dict
+            The hits, misses, evictions, entries and approximate bytes.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+            }
+
+
+# The process-wide cache consulted by DigestionSimulator and ProteasePredictor.
+digest_cache = DigestCache()
@@ -0,0 +1,122 @@
+import sqlite3
+
+
+# SQLite limits the number of variables of one statement to 999 in older versions.
+MAX_VARIABLES = 999
+
+
+class DigestStore:
+    def __init__(self, file_name):
+        """
+        This class represents a persistent store of peptide sets in a SQLite database.
+
+        Every digest is one row keyed by digest_key, which covers the sequence hash, the
+        protease definitions and the digest parameters. The key is the primary key of the
+        table, so a lookup is a single index search.
+
+        Parameters
+        ----------
+        file_name : str
+            The path of the database file. It is created if it does not exist.
+        """
+        self.file_name = file_name
+        self.connection = sqlite3.connect(file_name)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS digests "
+            "(key TEXT PRIMARY KEY, peptides TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM digests").fetchone()[0]
+
+    def __contains__(self, key):
+        row = self.connection.execute("SELECT 1 FROM digests WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _decode(peptides):
+        return frozenset(peptides.split('\n')) if peptides else frozenset()
+
+    def get(self, key):
+        """
+        Returns the stored peptides of a digest.
+
+        Parameters
+        ----------
+        key : str
+            The digest key, see digest_key.
+
+        Returns
+        -------
+        frozenset of str or None
+            The stored peptides, or None if the digest is not stored.
+        """
+        row = self.connection.execute("SELECT peptides FROM digests WHERE key = ?",
+                                      (key,)).fetchone()
+        return None if row is None else self._decode(row[0])
+
+    def get_many(self, keys):
+        """
+        Returns the stored peptides of many digests.
+
+        Parameters
+        ----------
+        keys : list of str
+            The digest keys.
+
+        Returns
+        -------
+        dict
+            Maps every stored key to its peptides. Keys that are not stored are left out.
+        """
+        keys = list(keys)
+        found = {}
+        for i in range(0, len(keys), MAX_VARIABLES):
+            batch = keys[i:i + MAX_VARIABLES]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.connection.execute(
+                f"SELECT key, peptides FROM digests WHERE key IN ({placeholders})", batch)
+            for key, peptides in rows:
+                found[key] = self._decode(peptides)
+        return found
+
+    def put(self, key, peptides):
+        """
+        Stores the peptides of a digest, replacing any stored peptides of the same key.
+
+        Parameters
+        ----------
+        key : str
+            The digest key, see digest_key.
+        peptides : iterable of str
+            The peptides of the digest.
+        """
+        self.put_many([(key, peptides)])
+
+    def put_many(self, items):
+        """
+        Stores the peptides of many digests in a single transaction.
+
+        Parameters
+        ----------
+        items : iterable of tuple
+            The (key, peptides) of every digest.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO digests (key, peptides) VALUES (?, ?)",
+                ((key, '\n'.join(sorted(peptides))) for key, peptides in items),
+            )
+
+    def close(self):
+        """Closes the database connection."""
+        self.connection.close()
@@ -1,37 +1,280 @@
 import pandas as pd
 
 from .PeptideNode import PeptideNode
+from .PeptideTree import build_peptide_tree
+from .PeptideDAG import build_peptide_dag
 from .proteases import available_proteases
 from .tools import generate_peptide_tree, draw_tree, extract_peptide_sequences
+from .tools import (generate_peptide_tree_iterative, draw_tree_iterative,
+                    extract_peptide_sequences_iterative)
+from .tools import iter_tree_lines, iter_tree_positions, write_lines
+from .intervals import (generate_peptide_intervals, extract_interval_sequences, draw_intervals,
+                        iter_interval_lines)
+from .intervals import generate_missed_cleavage_intervals
+from .coverage import interval_arrays, coverage_matrix
+from .mass import peptide_masses
+from .DigestCache import digest_cache, digest_key, digest_method
 
 
 
 class DigestionSimulator:
-    def __init__(self, sequence, proteases=None, min_peptide_length=3, min_length_color=5, max_depth=100):
+    def __init__(self, sequence, proteases=None, min_peptide_length=3, min_length_color=5,
+                 max_depth=100, engine='tree', traversal='recursive', use_cache=True,
+                 store=None, compact=False, max_missed_cleavages=None):
+        """
+        Simulates the digestion of a sequence by a set of proteases.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to digest.
+        proteases : list of Protease, optional
+            The proteases to digest the sequence with. The default is None.
+        min_peptide_length : int, optional
+            Peptides must be longer than this. The default is 3.
+        min_length_color : int, optional
+            Peptides shorter than this are highlighted by draw_tree. The default is 5.
+        max_depth : int, optional
+            The maximum depth of the peptide tree. The default is 100.
+        engine : str, optional
+            'tree' builds the recursive peptide tree, 'interval' lists the (start, end)
+            intervals between the cleavage sites of the sequence without building a tree,
+            'dag' builds a PeptideDAG whose nodes are the (start, end) intervals of the
+            peptides, each stored once with an edge from every parent. The default is 'tree'.
+        traversal : str, optional
+            How the tree engine builds, draws and reads the peptide tree. 'recursive' uses
+            the recursive functions, 'depth_first' and 'breadth_first' use an explicit stack
+            or queue and are not bound by the recursion limit. The default is 'recursive'.
+        use_cache : bool, optional
+            Whether to read and store the unique peptides in the process-wide digest_cache.
+            On a hit the peptide tree is only built when it is first accessed.
+            The default is True.
+        store : DigestStore, optional
+            A persistent store to read the unique peptides from before digesting, and to
+            write them to after digesting. The default is None.
+        compact : bool, optional
+            Whether the tree engine stores the tree as a PeptideTree of parallel arrays
+            instead of PeptideNode objects. root then returns a PeptideNodeView with the
+            same navigation API. The default is False.
+        max_missed_cleavages : int, optional
+            If given, lists only the peptides between sites of any of the proteases that
+            contain at most this many further sites, without a tree, and ignores engine,
+            traversal and max_depth. The default is None.
+        """
+        if engine not in ('tree', 'interval', 'dag'):
+            raise ValueError("Invalid engine value. Use 'tree', 'interval' or 'dag'.")
+        if traversal not in ('recursive', 'depth_first', 'breadth_first'):
+            raise ValueError("Invalid traversal value. "
+                             "Use 'recursive', 'depth_first' or 'breadth_first'.")
         self.sequence = sequence
         self.min_peptide_length = min_peptide_length
         self.min_length_color = min_length_color
         self.max_depth = max_depth
-        self.root = PeptideNode(sequence)
+        self.engine = engine
+        self.traversal = traversal
+        self._root = PeptideNode(sequence, start=0)
+        self._tree_generated = False
         self.unique_peptide_sequences = None
+        self.peptide_intervals = None
         self.proteases = proteases
-        self.generate_peptide_tree()
+        self.compact = compact
+        self.peptide_tree = None
+        self.peptide_dag = None
+        self.max_missed_cleavages = max_missed_cleavages
+        self.use_cache = use_cache
+        self.store = store
+        self.cache_key = None
+        if use_cache or store is not None:
+            self.cache_key = digest_key(sequence, proteases, min_peptide_length, max_depth,
+                                        digest_method(engine, traversal, max_missed_cleavages))
+        if max_missed_cleavages is not None:
+            self.generate_missed_cleavage_intervals()
+        elif engine == 'tree':
+            if not self._is_cached():
+                self.generate_peptide_tree()
+        elif engine == 'dag':
+            self.generate_peptide_dag()
+        else:
+            self.generate_peptide_intervals()
+
+    def _uses_intervals(self):
+        return self.max_missed_cleavages is not None or self.engine in ('interval', 'dag')
+
+    def _is_cached(self):
+        if self.use_cache and self.cache_key in digest_cache:
+            return True
+        return self.store is not None and self.cache_key in self.store
+
+    @property
+    def root(self):
+        if not self._tree_generated:
+            self.generate_peptide_tree()
+        return self._root
 
     def generate_peptide_tree(self):
-        generate_peptide_tree(self.root, self.proteases, 0, max_depth=self.max_depth, min_length=self.min_peptide_length)
-        
+        self._tree_generated = True
+        if self.compact:
+            order = 'breadth_first' if self.traversal == 'breadth_first' else 'depth_first'
+            self.peptide_tree = build_peptide_tree(self.sequence, self.proteases,
+                                                   max_depth=self.max_depth,
+                                                   min_length=self.min_peptide_length,
+                                                   order=order)
+            self._root = self.peptide_tree.root
+            return
+        if self.traversal != 'recursive':
+            generate_peptide_tree_iterative(self._root, self.proteases,
+                                            max_depth=self.max_depth,
+                                            min_length=self.min_peptide_length,
+                                            order=self.traversal)
+            return
+        generate_peptide_tree(self._root, self.proteases, 0, max_depth=self.max_depth,
+                              min_length=self.min_peptide_length)
+
+    def generate_peptide_intervals(self):
+        self.peptide_intervals = generate_peptide_intervals(self.sequence, self.proteases,
+                                                            min_length=self.min_peptide_length)
+        return self.peptide_intervals
+
+    def generate_missed_cleavage_intervals(self):
+        self.peptide_intervals = generate_missed_cleavage_intervals(
+            self.sequence, self.proteases, self.max_missed_cleavages,
+            min_length=self.min_peptide_length)
+        return self.peptide_intervals
+
+    def generate_peptide_dag(self):
+        self.peptide_dag = build_peptide_dag(self.sequence, self.proteases,
+                                             max_depth=self.max_depth,
+                                             min_length=self.min_peptide_length)
+        self.peptide_intervals = self.peptide_dag.intervals()
+        return self.peptide_dag
+
     def draw_tree(self):
+        if self._uses_intervals():
+            return draw_intervals(self.sequence, self.peptide_intervals)
+        if self.traversal != 'recursive':
+            return draw_tree_iterative(self.root, self.sequence,
+                                       min_length=self.min_length_color, order=self.traversal)
         return draw_tree(self.root, self.sequence, min_length=self.min_length_color, start_index=0)
 
     def print_tree(self, *args, **kwargs):
         print(self.draw_tree(*args, **kwargs))
 
+    def iter_tree_lines(self, start_line=0, max_lines=None):
+        """
+        Yields the lines of the peptide tree lazily, each peptide at its exact position.
+
+        Parameters
+        ----------
+        start_line : int, optional
+            The number of lines to skip, for paginating. The default is 0.
+        max_lines : int, optional
+            The maximum number of lines to yield. The default is None, which yields all lines.
+        """
+        if self._uses_intervals():
+            return iter_interval_lines(self.sequence, self.peptide_intervals,
+                                       start_line=start_line, max_lines=max_lines)
+        order = 'breadth_first' if self.traversal == 'breadth_first' else 'depth_first'
+        return iter_tree_lines(self.root, self.sequence, order=order, start_line=start_line,
+                               max_lines=max_lines)
+
+    def write_tree(self, stream, start_line=0, max_lines=None):
+        """
+        Writes the lines of the peptide tree to a text stream as they are generated.
+
+        Parameters
+        ----------
+        stream : file-like
+            The text stream to write to.
+        start_line : int, optional
+            The number of lines to skip. The default is 0.
+        max_lines : int, optional
+            The maximum number of lines to write. The default is None.
+
+        Returns
+        -------
+        int
+            The number of lines written.
+        """
+        return write_lines(self.iter_tree_lines(start_line=start_line, max_lines=max_lines),
+                           stream)
+
+    def peptide_coverage(self):
+        """
+        Returns the positions of all peptides as start and end arrays.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            The start and end positions, sorted by start and then end.
+        """
+        if self._uses_intervals():
+            return interval_arrays(self.peptide_intervals)
+        positions = iter_tree_positions(self.root, self.sequence)
+        return interval_arrays((start, start + len(peptide)) for start, peptide in positions)
+
+    def coverage_matrix(self):
+        """
+        Returns the peptide x residue coverage matrix, see coverage.coverage_matrix.
+        """
+        starts, ends = self.peptide_coverage()
+        return coverage_matrix(starts, ends, len(self.sequence))
+
+    def peptide_masses(self, kind='monoisotopic'):
+        """
+        Returns the neutral mass of every peptide at every position.
+
+        Parameters
+        ----------
+        kind : str, optional
+            'monoisotopic' or 'average'. The default is 'monoisotopic'.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The Peptide, Start, End and Mass of every peptide, sorted by Start and End.
+        """
+        starts, ends = self.peptide_coverage()
+        intervals = zip(starts.tolist(), ends.tolist())
+        return pd.DataFrame({
+            'Peptide': [self.sequence[start:end] for start, end in intervals],
+            'Start': starts,
+            'End': ends,
+            'Mass': peptide_masses(self.sequence, starts, ends, kind),
+        })
+
     def extract_unique_peptide_sequences(self):
-        self.unique_peptide_sequences = extract_peptide_sequences(self.root)
+        if self.use_cache:
+            cached = digest_cache.get(self.cache_key)
+            if cached is not None:
+                self.unique_peptide_sequences = set(cached)
+                return self.unique_peptide_sequences
+        if self.store is not None:
+            stored = self.store.get(self.cache_key)
+            if stored is not None:
+                if self.use_cache:
+                    digest_cache.put(self.cache_key, stored)
+                self.unique_peptide_sequences = set(stored)
+                return self.unique_peptide_sequences
+        self.unique_peptide_sequences = self._extract_unique_peptide_sequences()
+        if self.use_cache:
+            digest_cache.put(self.cache_key, self.unique_peptide_sequences)
+        if self.store is not None:
+            self.store.put(self.cache_key, self.unique_peptide_sequences)
+        return self.unique_peptide_sequences
+
+    def _extract_unique_peptide_sequences(self):
+        if self._uses_intervals():
+            return extract_interval_sequences(self.sequence, self.peptide_intervals)
+        if self.compact:
+            tree = self.root.tree
+            intervals = zip(tree.starts[1:].tolist(), tree.ends[1:].tolist())
+            return extract_interval_sequences(self.sequence, intervals)
+        if self.traversal != 'recursive':
+            return extract_peptide_sequences_iterative(self.root)
+        unique_peptide_sequences = extract_peptide_sequences(self.root)
         #print('+'*80)
         #print("Extracted unique peptide sequences (excluding root sequence):")
-        #for i, _sequence in enumerate(sorted(self.unique_peptide_sequences, key=len)):
+        #for i, _sequence in enumerate(sorted(unique_peptide_sequences, key=len)):
         #    print(i, _sequence)
         #print('+'*80)
-        return self.unique_peptide_sequences
-
+        return unique_peptide_sequences
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+
+from .mass import neutral_masses, sequence_masses
+
+
+class MassMatcher:
+    def __init__(self, peptides, proteins=None, kind='monoisotopic'):
+        """
+        Matches observed precursor masses to predicted peptides within a tolerance.
+
+        The masses of the peptides are computed once and kept sorted, so every observed
+        mass is matched by two binary searches for the bounds of its tolerance window.
+        Peptides containing a residue without a mass are left out.
+
+        Parameters
+        ----------
+        peptides : list of str
+            The predicted peptides.
+        proteins : list of str, optional
+            The protein each peptide comes from, parallel to peptides. The default is None.
+        kind : str, optional
+            'monoisotopic' or 'average'. The default is 'monoisotopic'.
+        """
+        peptides = list(peptides)
+        masses = sequence_masses(peptides, kind)
+        order = np.argsort(masses, kind='stable')
+        order = order[~np.isnan(masses[order])]
+        self.kind = kind
+        self.masses = masses[order]
+        self.peptides = np.array(peptides, dtype=object)[order]
+        self.proteins = None
+        if proteins is not None:
+            self.proteins = np.array(list(proteins), dtype=object)[order]
+
+    def __len__(self):
+        return len(self.masses)
+
+    @classmethod
+    def from_simulator(cls, simulator, kind='monoisotopic'):
+        """
+        Builds a matcher for the unique peptides of a DigestionSimulator.
+
+        Parameters
+        ----------
+        simulator : DigestionSimulator
+            The digest.
+        kind : str, optional
+            'monoisotopic' or 'average'. The default is 'monoisotopic'.
+
+        Returns
+        -------
+        MassMatcher
+            The matcher.
+        """
+        return cls(sorted(simulator.extract_unique_peptide_sequences()), kind=kind)
+
+    @classmethod
+    def from_records(cls, records, kind='monoisotopic'):
+        """
+        Builds a matcher for the peptides of a proteome digest.
+
+        Parameters
+        ----------
+        records : iterable of tuple
+            The accession and peptides of every protein, as returned by batch.digest_records.
+        kind : str, optional
+            'monoisotopic' or 'average'. The default is 'monoisotopic'.
+
+        Returns
+        -------
+        MassMatcher
+            The matcher, with the accession of every peptide as its protein.
+        """
+        peptides, proteins = [], []
+        for accession, protein_peptides in records:
+            peptides.extend(protein_peptides)
+            proteins.extend([accession] * len(protein_peptides))
+        return cls(peptides, proteins, kind=kind)
+
+    @classmethod
+    def from_tsv(cls, file_name, kind='monoisotopic'):
+        """
+        Builds a matcher from the output file of batch.digest_fasta.
+
+        Parameters
+        ----------
+        file_name : str
+            The tab-separated file with columns accession and peptide.
+        kind : str, optional
+            'monoisotopic' or 'average'. The default is 'monoisotopic'.
+
+        Returns
+        -------
+        MassMatcher
+            The matcher.
+        """
+        df = pd.read_csv(file_name, sep='\t', dtype=str, keep_default_na=False)
+        return cls(df['peptide'].tolist(), df['accession'].tolist(), kind=kind)
+
+    def match_indices(self, observed, charges=(1, 2, 3, 4), tolerance=10.0, unit='ppm'):
+        """
+        Finds all predicted peptides within the tolerance of every observed value.
+
+        Parameters
+        ----------
+        observed : array-like of float
+            The observed m/z values, or neutral masses if charges is None.
+        charges : tuple of int, optional
+            The charge states every m/z value is tried with. The default is (1, 2, 3, 4).
+        tolerance : float, optional
+            The maximum difference between observed and predicted neutral mass. The default
+            is 10.0.
+        unit : str, optional
+            'ppm' for a tolerance relative to the observed neutral mass or 'Da' for an
+            absolute one. The default is 'ppm'.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            The index of the observed value, the charge (0 for neutral masses), the
+            observed neutral mass and the index of the matched peptide of every match.
+        """
+        if unit not in ('ppm', 'Da'):
+            raise ValueError("Invalid unit value. Use 'ppm' or 'Da'.")
+        observed = np.asarray(observed, dtype=np.float64).ravel()
+        if charges is None:
+            charge_array = np.zeros(1, dtype=np.int64)
+            queries = observed[None, :]
+        else:
+            charge_array = np.asarray(charges, dtype=np.int64)
+            queries = neutral_masses(observed[None, :], charge_array[:, None])
+        # sorted queries make the binary searches walk the masses in order, which is
+        # several times faster than random lookups into a large array
+        queries = queries.ravel()
+        order = np.argsort(queries, kind='stable')
+        queries = queries[order]
+        query_indices = np.tile(np.arange(len(observed)), len(charge_array))[order]
+        query_charges = np.repeat(charge_array, len(observed))[order]
+
+        window = queries * tolerance * 1e-6 if unit == 'ppm' else tolerance
+        lo = np.searchsorted(self.masses, queries - window, side='left')
+        hi = np.searchsorted(self.masses, queries + window, side='right')
+        counts = hi - lo
+
+        # expand every [lo, hi) range into the peptide indices it contains
+        matches = np.repeat(np.arange(len(queries)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        peptide_indices = lo[matches] + offsets
+        return (query_indices[matches], query_charges[matches], queries[matches],
+                peptide_indices)
+
+    def match(self, observed, charges=(1, 2, 3, 4), tolerance=10.0, unit='ppm'):
+        """
+        Matches observed values to predicted peptides, see match_indices.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per match with the Query index, Observed value, Charge, observed
+            Neutral_Mass, Peptide, Protein (if known), predicted Mass and the
+            Delta_Da and Delta_ppm of the predicted mass from the observed one.
+        """
+        query_indices, query_charges, query_masses, peptide_indices = self.match_indices(
+            observed, charges=charges, tolerance=tolerance, unit=unit)
+        observed = np.asarray(observed, dtype=np.float64).ravel()
+        masses = self.masses[peptide_indices]
+        columns = {
+            'Query': query_indices,
+            'Observed': observed[query_indices],
+            'Charge': query_charges,
+            'Neutral_Mass': query_masses,
+            'Peptide': self.peptides[peptide_indices],
+        }
+        if self.proteins is not None:
+            columns['Protein'] = self.proteins[peptide_indices]
+        columns['Mass'] = masses
+        columns['Delta_Da'] = masses - query_masses
+        columns['Delta_ppm'] = (masses - query_masses) / query_masses * 1e6
+        df = pd.DataFrame(columns).sort_values(['Query', 'Charge', 'Mass'], kind='stable')
+        return df.reset_index(drop=True)
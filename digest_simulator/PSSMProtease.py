@@ -0,0 +1,207 @@
+import numpy as np
+
+from .Protease import Protease, encode_sequence
+
+
+# the residue the sequences are padded with; it scores 0 at every subsite
+PADDING = 0
+
+
+class PSSMProtease(Protease):
+    def __init__(self, name, scores, n_nonprime=None, threshold=0.0):
+        """
+        This class represents a protease whose specificity is a position-specific scoring
+        matrix over the subsites around the scissile bond, e.g. P4 P3 P2 P1 | P1' P2' P3' P4'
+        in the nomenclature of Schechter and Berger.
+
+        A bond is scored by summing the score of every subsite for the residue at that
+        subsite, and is a cleavage site when the score reaches the threshold. Subsites
+        beyond the ends of the sequence and residues without a score contribute 0.
+
+        DigestionSimulator, with any engine, and ProteasePredictor cut every peptide at the
+        sites of the full sequence, so the residues flanking a peptide keep contributing.
+        Only cleave, called on its own, scores the given peptide without them.
+
+        The residue lists of Protease are empty, as the matrix replaces them.
+
+        Parameters
+        ----------
+        name : str
+            The name of the protease.
+        scores : dict of str to list of float
+            The score of every residue at every subsite, from the N-terminal subsite to
+            the C-terminal one. All lists must have the same length.
+        n_nonprime : int, optional
+            The number of subsites before the scissile bond. The default is None, which
+            places the bond in the middle.
+        threshold : float, optional
+            The minimum score of a cleavage site. The default is 0.0.
+        """
+        lengths = {len(residue_scores) for residue_scores in scores.values()}
+        if len(lengths) != 1:
+            raise ValueError("Give every residue one score per subsite.")
+        n_subsites = lengths.pop()
+        if n_nonprime is None:
+            n_nonprime = n_subsites // 2
+        if not 0 < n_nonprime < n_subsites:
+            raise ValueError("There must be at least one subsite on each side of the "
+                             "scissile bond.")
+
+        super().__init__(name, cleavage_residues=[], no_cleavage_after=[],
+                         cleavage_position='C')
+        self.scores = {residue: tuple(float(score) for score in residue_scores)
+                       for residue, residue_scores in scores.items()}
+        self.n_nonprime = n_nonprime
+        self.threshold = threshold
+        self.score_table = np.zeros((n_subsites, 256))
+        for residue, residue_scores in self.scores.items():
+            self.score_table[:, ord(residue)] = residue_scores
+
+    @classmethod
+    def from_sites(cls, name, windows, n_nonprime=None, threshold=0.0, pseudocount=1.0,
+                   background=None):
+        """
+        Builds a log-odds PSSM from the windows around known cleavage sites, such as the
+        substrates of a protease in MEROPS.
+
+        Parameters
+        ----------
+        name : str
+            The name of the protease.
+        windows : list of str
+            The residues around each known site, all of the same length, from the
+            N-terminal subsite to the C-terminal one.
+        n_nonprime : int, optional
+            The number of subsites before the scissile bond. The default is None, which
+            places the bond in the middle.
+        threshold : float, optional
+            The minimum score of a cleavage site. The default is 0.0.
+        pseudocount : float, optional
+            The count added to every residue at every subsite. The default is 1.0.
+        background : dict of str to float, optional
+            The background frequency of every residue. The default is None, which uses
+            equal frequencies for the 20 standard residues.
+
+        Returns
+        -------
+        PSSMProtease
+            The protease with score log2(frequency / background) for every residue and subsite.
+        """
+        if background is None:
+            background = {residue: 1 / 20 for residue in 'ACDEFGHIKLMNPQRSTVWY'}
+        residues = sorted(background)
+        codes = np.array([encode_sequence(window) for window in windows])
+        lookup = np.full(256, -1)
+        lookup[[ord(residue) for residue in residues]] = np.arange(len(residues))
+        indices = lookup[codes]
+
+        counts = np.full((codes.shape[1], len(residues)), pseudocount)
+        for subsite in range(codes.shape[1]):
+            known = indices[:, subsite] >= 0
+            counts[subsite] += np.bincount(indices[known, subsite], minlength=len(residues))
+        frequencies = counts / counts.sum(axis=1, keepdims=True)
+        expected = np.array([background[residue] for residue in residues])
+        log_odds = np.log2(frequencies / expected)
+        scores = {residue: log_odds[:, i].tolist() for i, residue in enumerate(residues)}
+        return cls(name, scores, n_nonprime=n_nonprime, threshold=threshold)
+
+    def definition(self):
+        """
+        Returns the parameters that determine where the protease cleaves.
+
+        Returns
+        -------
+        tuple
+            The class name, name, sorted scores, number of non-prime subsites and threshold.
+        """
+        return (type(self).__name__, self.name, tuple(sorted(self.scores.items())),
+                self.n_nonprime, self.threshold)
+
+    def site_scores(self, codes):
+        """
+        Scores every bond of an encoded sequence with a sliding-window sum.
+
+        Parameters
+        ----------
+        codes : numpy.ndarray
+            The encoded sequence, see encode_sequence.
+
+        Returns
+        -------
+        numpy.ndarray
+            A float array of length len(codes) - 1. Entry i is the score of the bond
+            between residue i and residue i + 1.
+        """
+        n_bonds = max(len(codes) - 1, 0)
+        n_subsites = len(self.score_table)
+        # after padding, the window of bond i starts at position i of the padded codes
+        left = np.full(self.n_nonprime - 1, PADDING, dtype=np.uint8)
+        right = np.full(n_subsites - self.n_nonprime - 1, PADDING, dtype=np.uint8)
+        padded = np.concatenate((left, codes, right))
+        scores = np.zeros(n_bonds)
+        for subsite in range(n_subsites):
+            scores += self.score_table[subsite, padded[subsite:subsite + n_bonds]]
+        return scores
+
+    def site_probabilities(self, codes, scale=1.0):
+        """
+        Converts the site scores into cleavage probabilities with a logistic function,
+        1 / (1 + exp(-(score - threshold) / scale)). These can be passed as efficiencies
+        to stochastic.simulate_stochastic_digestion.
+
+        Parameters
+        ----------
+        codes : numpy.ndarray
+            The encoded sequence, see encode_sequence.
+        scale : float, optional
+            The score difference that changes the odds of cleavage e-fold. The default is 1.0.
+
+        Returns
+        -------
+        numpy.ndarray
+            The probability of every bond, 0.5 at the threshold.
+        """
+        return 1 / (1 + np.exp(-(self.site_scores(codes) - self.threshold) / scale))
+
+    def site_mask(self, codes):
+        """
+        Computes the cleavage site mask of the protease for an encoded sequence.
+
+        Parameters
+        ----------
+        codes : numpy.ndarray
+            The encoded sequence, see encode_sequence.
+
+        Returns
+        -------
+        numpy.ndarray
+            A boolean array of length len(codes) - 1. Entry i is True when the score of
+            the bond between residue i and residue i + 1 reaches the threshold.
+        """
+        return self.site_scores(codes) >= self.threshold
+
+    def score_sequences(self, sequences):
+        """
+        Scores every bond of many sequences, such as a proteome, in one pass.
+
+        The sequences are concatenated with enough padding between them that no window
+        reaches into a neighbouring sequence, and scored with one site_scores call.
+
+        Parameters
+        ----------
+        sequences : list of str
+            The sequences.
+
+        Returns
+        -------
+        list of numpy.ndarray
+            The site scores of every sequence.
+        """
+        gap = len(self.score_table)
+        separator = chr(PADDING) * gap
+        scores = self.site_scores(encode_sequence(separator.join(sequences)))
+        result, offset = [], 0
+        for sequence in sequences:
+            result.append(scores[offset:offset + max(len(sequence) - 1, 0)])
+            offset += len(sequence) + gap
+        return result
@@ -0,0 +1,162 @@
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+import numpy as np
+
+from .intervals import find_site_masks
+
+
+def _csr(keys, values, n):
+    """Groups values by key into compressed offsets and values, keeping their order."""
+    order = np.argsort(keys, kind='stable')
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=n)))).astype(np.int64)
+    return offsets, values[order]
+
+
+class PeptideDAG:
+    def __init__(self, sequence, starts, ends, depths, edge_parents, edge_children,
+                 edge_proteases, protease_names=None):
+        """
+        This class represents the peptides of a digest as a directed acyclic graph.
+
+        Every node is a (start, end) interval of the sequence and is stored once, however
+        many parents produce it. An edge links a parent to each piece that one protease
+        cuts it into, so a node has one parent edge per (parent, protease) that yields it.
+        Node 0 is the full sequence.
+
+        Parameters
+        ----------
+        sequence : str
+            The digested sequence.
+        starts, ends : array-like of int
+            The interval of every node.
+        depths : array-like of int
+            The length of the shortest path from the root to every node.
+        edge_parents, edge_children : array-like of int
+            The parent and child node of every edge.
+        edge_proteases : array-like of int
+            The index of the protease of every edge.
+        protease_names : list of str, optional
+            The names of the proteases. The default is None.
+        """
+        self.sequence = sequence
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.depths = np.asarray(depths, dtype=np.int64)
+        self.edge_parents = np.asarray(edge_parents, dtype=np.int64)
+        self.edge_children = np.asarray(edge_children, dtype=np.int64)
+        self.edge_proteases = np.asarray(edge_proteases, dtype=np.int64)
+        self.protease_names = protease_names
+        intervals = zip(self.starts.tolist(), self.ends.tolist())
+        self.index = {(start, end): i for i, (start, end) in enumerate(intervals)}
+
+        n = len(self.starts)
+        edges = np.arange(len(self.edge_parents))
+        self._child_offsets, self._child_edges = _csr(self.edge_parents, edges, n)
+        self._parent_offsets, self._parent_edges = _csr(self.edge_children, edges, n)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __contains__(self, interval):
+        return tuple(interval) in self.index
+
+    def peptide(self, node):
+        return self.sequence[self.starts[node]:self.ends[node]]
+
+    def node(self, start, end):
+        """Returns the index of the node of the given interval."""
+        return self.index[(start, end)]
+
+    def child_edges(self, node):
+        return self._child_edges[self._child_offsets[node]:self._child_offsets[node + 1]]
+
+    def parent_edges(self, node):
+        return self._parent_edges[self._parent_offsets[node]:self._parent_offsets[node + 1]]
+
+    def children(self, node):
+        """Returns the distinct children of a node in the order they were found."""
+        return list(dict.fromkeys(self.edge_children[self.child_edges(node)].tolist()))
+
+    def parents(self, node):
+        """Returns the distinct parents of a node in the order they were found."""
+        return list(dict.fromkeys(self.edge_parents[self.parent_edges(node)].tolist()))
+
+    def intervals(self):
+        """
+        Returns the (start, end) interval of every node except the root, sorted.
+        """
+        return sorted(zip(self.starts[1:].tolist(), self.ends[1:].tolist()))
+
+    def unique_peptide_sequences(self):
+        """
+        Returns the unique peptide sequences of all nodes except the root.
+        """
+        sequence = self.sequence
+        intervals = zip(self.starts[1:].tolist(), self.ends[1:].tolist())
+        return {sequence[start:end] for start, end in intervals}
+
+
+def build_peptide_dag(sequence, proteases, max_depth=None, min_length=0, site_masks=None):
+    """
+    Builds the peptide DAG of a digest breadth first.
+
+    The cleavage sites are found once on the full sequence. The pieces of a node are read
+    from the sorted sites of each protease by bisection, and each (start, end) interval
+    is expanded only the first time it is reached, so shared sub-peptides are computed once.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to digest.
+    proteases : list of Protease
+        The proteases to digest the sequence with.
+    max_depth : int, optional
+        Nodes at this depth are not expanded. The default is None, which means no limit.
+    min_length : int, optional
+        Peptides must be longer than this. The default is 0.
+    site_masks : list of numpy.ndarray, optional
+        Precomputed site masks of each protease. The default is None.
+
+    Returns
+    -------
+    PeptideDAG
+        The peptide DAG.
+    """
+    n = len(sequence)
+    if site_masks is None:
+        site_masks = find_site_masks(sequence, proteases)
+    site_lists = [(np.flatnonzero(mask) + 1).tolist() for mask in site_masks]
+
+    index = {(0, n): 0}
+    starts, ends, depths = [0], [n], [0]
+    edge_parents, edge_children, edge_proteases = [], [], []
+
+    queue = deque([0])
+    while queue:
+        node = queue.popleft()
+        start, end, depth = starts[node], ends[node], depths[node]
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for j, sites in enumerate(site_lists):
+            lo, hi = bisect_right(sites, start), bisect_left(sites, end)
+            if lo == hi:
+                continue
+            bounds = [start] + sites[lo:hi] + [end]
+            for child_start, child_end in zip(bounds, bounds[1:]):
+                if child_end - child_start <= min_length:
+                    continue
+                child = index.get((child_start, child_end))
+                if child is None:
+                    child = len(starts)
+                    index[(child_start, child_end)] = child
+                    starts.append(child_start)
+                    ends.append(child_end)
+                    depths.append(depth + 1)
+                    queue.append(child)
+                edge_parents.append(node)
+                edge_children.append(child)
+                edge_proteases.append(j)
+
+    return PeptideDAG(sequence, starts, ends, depths, edge_parents, edge_children,
+                      edge_proteases, protease_names=[protease.name for protease in proteases])
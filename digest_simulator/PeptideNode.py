@@ -1,5 +1,7 @@
 class PeptideNode:
-    def __init__(self, peptide, parent=None):
+    __slots__ = ('peptide', 'parent', 'start', 'children')
+
+    def __init__(self, peptide, parent=None, start=None):
       """
       This class represents a node in a peptide tree.
 
@@ -9,9 +11,12 @@ class PeptideNode:
           The peptide sequence of the node.
       parent : PeptideNode, optional 
           The parent node of the node. The default is None.
+      start : int, optional
+          The position of the peptide in the digested sequence. The default is None.
       """
       self.peptide = peptide
       self.parent = parent
+      self.start = start
       self.children = []
 
     def add_child(self, child):
@@ -0,0 +1,226 @@
+from array import array
+from collections import deque
+
+import numpy as np
+
+from .Protease import encode_sequence
+from .tools import cut_at_sites
+
+
+class PeptideNodeView:
+    """
+    A lightweight view of one node of a PeptideTree with the navigation API of PeptideNode.
+
+    Views hold only the tree and an index and are created on demand.
+    """
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return (isinstance(other, PeptideNodeView) and self.tree is other.tree
+                and self.index == other.index)
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def __str__(self):
+        return self.peptide
+
+    @property
+    def peptide(self):
+        return self.tree.peptide(self.index)
+
+    @property
+    def start(self):
+        return int(self.tree.starts[self.index])
+
+    @property
+    def end(self):
+        return int(self.tree.ends[self.index])
+
+    @property
+    def depth(self):
+        return int(self.tree.depths[self.index])
+
+    @property
+    def parent(self):
+        parent = self.tree.parents[self.index]
+        return None if parent < 0 else PeptideNodeView(self.tree, int(parent))
+
+    @property
+    def children(self):
+        return [PeptideNodeView(self.tree, int(child))
+                for child in self.tree.children(self.index)]
+
+
+class PeptideTree:
+    def __init__(self, sequence, parents, starts, ends, depths):
+        """
+        This class represents a peptide tree as parallel arrays instead of node objects.
+
+        Node 0 is the root. The children of every node are kept in the order they were
+        added, in a compressed index built once from the parent array.
+
+        Parameters
+        ----------
+        sequence : str
+            The digested sequence. Peptides are slices of it and are not stored.
+        parents : array-like of int
+            The index of the parent of every node, -1 for the root.
+        starts : array-like of int
+            The start position of every peptide in the sequence.
+        ends : array-like of int
+            The end position of every peptide in the sequence.
+        depths : array-like of int
+            The depth of every node, 0 for the root.
+        """
+        dtype = np.int32 if len(sequence) < 2**31 else np.int64
+        self.sequence = sequence
+        self.parents = np.asarray(parents, dtype=dtype)
+        self.starts = np.asarray(starts, dtype=dtype)
+        self.ends = np.asarray(ends, dtype=dtype)
+        self.depths = np.asarray(depths, dtype=dtype)
+
+        child_parents = self.parents[1:]
+        self.child_indices = (np.argsort(child_parents, kind='stable') + 1).astype(dtype)
+        counts = np.bincount(child_parents, minlength=len(self.parents))
+        self.child_offsets = np.concatenate(([0], np.cumsum(counts))).astype(dtype)
+
+    def __len__(self):
+        return len(self.parents)
+
+    @property
+    def root(self):
+        return PeptideNodeView(self, 0)
+
+    @property
+    def nbytes(self):
+        arrays = (self.parents, self.starts, self.ends, self.depths, self.child_indices,
+                  self.child_offsets)
+        return sum(a.nbytes for a in arrays)
+
+    def node(self, index):
+        return PeptideNodeView(self, index)
+
+    def peptide(self, index):
+        return self.sequence[self.starts[index]:self.ends[index]]
+
+    def children(self, index):
+        return self.child_indices[self.child_offsets[index]:self.child_offsets[index + 1]]
+
+    @classmethod
+    def from_node(cls, root, sequence):
+        """
+        Converts a tree of PeptideNode objects with start positions into a PeptideTree.
+
+        Parameters
+        ----------
+        root : PeptideNode
+            The root of the object tree.
+        sequence : str
+            The digested sequence.
+
+        Returns
+        -------
+        PeptideTree
+            The same tree in array form.
+        """
+        root_start = root.start or 0
+        parents, starts, depths = [-1], [root_start], [0]
+        ends = [root_start + len(root.peptide)]
+        stack = [(root, 0)]
+        while stack:
+            node, index = stack.pop()
+            for child in node.children:
+                stack.append((child, len(parents)))
+                parents.append(index)
+                starts.append(child.start)
+                ends.append(child.start + len(child.peptide))
+                depths.append(depths[index] + 1)
+        return cls(sequence, parents, starts, ends, depths)
+
+
+def build_peptide_tree(sequence, proteases, max_depth=None, min_length=0, order='depth_first'):
+    """
+    Generates a peptide tree directly into a PeptideTree, without node objects.
+
+    The tree has the same nodes and child order as generate_peptide_tree_iterative with
+    the same order.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to digest.
+    proteases : list of Protease
+        The list of proteases to use for generating the peptide tree.
+    max_depth : int, optional
+        The maximum depth of the peptide tree. The default is None, which means no limit.
+    min_length : int, optional
+        The minimum length of the peptides in the peptide tree. The default is 0.
+    order : str, optional
+        'depth_first' or 'breadth_first'. The default is 'depth_first'.
+
+    Returns
+    -------
+    PeptideTree
+        The peptide tree.
+    """
+    parents, starts = array('q', [-1]), array('q', [0])
+    ends, depths = array('q', [len(sequence)]), array('q', [0])
+    peptides_added = set()
+    codes = encode_sequence(sequence)
+    site_lists = [(np.flatnonzero(protease.site_mask(codes)) + 1).tolist()
+                  for protease in proteases]
+
+    def expandable(depth):
+        return max_depth is None or depth < max_depth
+
+    def cleaved_peptides(index):
+        start, end = starts[index], ends[index]
+        peptide = sequence[start:end]
+        for sites in site_lists:
+            yield from cut_at_sites(peptide, start, sites)
+
+    def add(peptide, start, parent, depth):
+        # a piece as long as its parent is the uncleaved parent
+        if len(peptide) == ends[parent] - starts[parent]:
+            return None
+        if len(peptide) <= min_length or peptide in peptides_added:
+            return None
+        peptides_added.add(peptide)
+        parents.append(parent)
+        starts.append(start)
+        ends.append(start + len(peptide))
+        depths.append(depth)
+        return len(parents) - 1
+
+    if order == 'depth_first':
+        stack = [(0, 0, cleaved_peptides(0))] if expandable(0) else []
+        while stack:
+            index, depth, peptides = stack[-1]
+            for peptide, start in peptides:
+                child = add(peptide, start, index, depth + 1)
+                if child is not None:
+                    if expandable(depth + 1):
+                        stack.append((child, depth + 1, cleaved_peptides(child)))
+                    break
+            else:
+                stack.pop()
+    elif order == 'breadth_first':
+        queue = deque([0])
+        while queue:
+            index = queue.popleft()
+            depth = depths[index]
+            if not expandable(depth):
+                continue
+            for peptide, start in cleaved_peptides(index):
+                child = add(peptide, start, index, depth + 1)
+                if child is not None:
+                    queue.append(child)
+    else:
+        raise ValueError("Invalid order value. Use 'depth_first' or 'breadth_first'.")
+
+    return PeptideTree(sequence, parents, starts, ends, depths)
@@ -1,3 +1,45 @@
+import numpy as np
+
+
+def encode_sequence(sequence):
+    """
+    Encodes the given sequence as an array of byte codes.
+
+    Every character becomes one code, so positions are kept. Characters outside ASCII
+    are encoded as '?', which is not a residue of any protease.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to encode.
+
+    Returns
+    -------
+    numpy.ndarray
+        The uint8 code of every residue.
+    """
+    return np.frombuffer(sequence.encode('ascii', errors='replace'), dtype=np.uint8)
+
+
+def residue_table(residues):
+    """
+    Builds a boolean lookup table over all byte codes for the given residues.
+
+    Parameters
+    ----------
+    residues : list of str
+        The residues to mark as True.
+
+    Returns
+    -------
+    numpy.ndarray
+        A boolean array of length 256.
+    """
+    table = np.zeros(256, dtype=bool)
+    table[[ord(residue) for residue in residues]] = True
+    return table
+
+
 class Protease:
     def __init__(self, name, cleavage_residues, no_cleavage_after, cleavage_position):
         """
@@ -18,26 +60,65 @@ class Protease:
         self.cleavage_residues = cleavage_residues
         self.no_cleavage_after = no_cleavage_after
         self.cleavage_position = cleavage_position
+        self.cleavage_table = residue_table(cleavage_residues)
+        self.no_cleavage_table = residue_table(no_cleavage_after)
+
+    def definition(self):
+        """
+        Returns the parameters that determine where the protease cleaves.
+
+        Returns
+        -------
+        tuple
+            The class name, name, cleavage residues, exclusions and cleavage position.
+        """
+        return (type(self).__name__, self.name, tuple(self.cleavage_residues),
+                tuple(self.no_cleavage_after), self.cleavage_position)
 
     def cleave(self, sequence):
-        peptides = []
-        start = 0
+        sites = self.cleavage_sites(sequence)
+        bounds = [0] + sites + [len(sequence)]
+        return [sequence[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
 
+    def cleavage_sites(self, sequence):
+        """
+        Returns the cleavage sites of the protease in the given sequence.
+
+        A site is the index of the first residue after the cut, so cutting
+        ``sequence`` at every returned site yields the peptides of ``cleave``.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to search for cleavage sites.
+
+        Returns
+        -------
+        list of int
+            The sorted cleavage sites, each in the range 1 to len(sequence) - 1.
+        """
+        return (np.flatnonzero(self.site_mask(encode_sequence(sequence))) + 1).tolist()
+
+    def site_mask(self, codes):
+        """
+        Computes the cleavage site mask of the protease for an encoded sequence.
+
+        Parameters
+        ----------
+        codes : numpy.ndarray
+            The encoded sequence, see encode_sequence.
+
+        Returns
+        -------
+        numpy.ndarray
+            A boolean array of length len(codes) - 1. Entry i is True when the protease
+            cuts between residue i and residue i + 1.
+        """
         if self.cleavage_position == 'C':
-            for i in range(len(sequence) - 1):
-                if sequence[i] in self.cleavage_residues and sequence[i + 1] not in self.no_cleavage_after:
-                    peptides.append(sequence[start:i + 1])
-                    start = i + 1
+            p1, p1_prime = codes[:-1], codes[1:]
+            return self.cleavage_table[p1] & ~self.no_cleavage_table[p1_prime]
         elif self.cleavage_position == 'N':
-            for i in range(1, len(sequence)):
-                if sequence[i] in self.cleavage_residues and sequence[i - 1] not in self.no_cleavage_after:
-                    peptides.append(sequence[start:i])
-                    start = i
+            p1_prime, p1 = codes[1:], codes[:-1]
+            return self.cleavage_table[p1_prime] & ~self.no_cleavage_table[p1]
         else:
             raise ValueError("Invalid cleavage_position value. Use 'C' for C-terminal or 'N' for N-terminal.")
-        
-        peptides.append(sequence[start:])
-        return peptides
-    
-
-
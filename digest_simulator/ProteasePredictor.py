@@ -1,64 +1,316 @@
-from itertools import combinations
-import pandas as pd
+import heapq
+import os
 
-from .DigestionSimulator import DigestionSimulator
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations
+import numpy as np
 import pandas as pd
 
+from .Protease import encode_sequence
+from .DigestCache import digest_cache, digest_key
+from .intervals import intervals_from_site_masks
+
+
+def _score_chunk(predictor, chunk, peptide_sequences_set):
+    """Scores a chunk of (position, protease indices) pairs, the task of each worker."""
+    rows = []
+    for position, indices in chunk:
+        protease_combination = [predictor.proteases[i] for i in indices]
+        names = '+'.join([p.name for p in protease_combination])
+        cleaved_peptides_set = predictor._simulated_cleave(protease_combination)
+        matched_peptides_count, score = predictor._score(cleaved_peptides_set,
+                                                         peptide_sequences_set)
+        rows.append((position, names, matched_peptides_count, score))
+    return rows
+
+
 class ProteasePredictor:
-    def __init__(self, original_sequence, proteases, lambda_penalty=0.5, min_peptide_length=3):
+    def __init__(self, original_sequence, proteases, lambda_penalty=0.5, min_peptide_length=3,
+                 use_cache=True):
         """
         Initialize the ProteasePredictor with the given sequence and proteases.
         
         Parameters:
         - original_sequence (str): Original protein sequence that was digested.
         - proteases (list): List of protease objects to be considered in the prediction.
-        - lambda_penalty (float, optional): Penalty weight for unmatched predicted peptides. Default is 0.5.
-        - min_peptide_length (int, optional): Minimum peptide length to consider in the prediction. Default is 3.
+        - lambda_penalty (float, optional): Penalty weight for unmatched predicted peptides.
+          Default is 0.5.
+        - min_peptide_length (int, optional): Minimum peptide length to consider in the
+          prediction. Default is 3.
+        - use_cache (bool, optional): Whether combination digests are read from and stored in
+          the process-wide digest_cache. Default is True.
         """
         self.original_sequence = original_sequence
         self.proteases = proteases
         self.lambda_penalty = lambda_penalty
         self.min_peptide_length = min_peptide_length
+        self.use_cache = use_cache
+        self._site_masks = {}
+        self.search_statistics = None
+
+    def _site_mask(self, protease):
+        """Returns the cleavage site mask of a protease, computed once per sequence."""
+        key = id(protease)
+        if key not in self._site_masks:
+            site_mask = protease.site_mask(encode_sequence(self.original_sequence))
+            self._site_masks[key] = (protease, site_mask)
+        return self._site_masks[key][1]
+
+    def __getstate__(self):
+        # the site masks are keyed by object id, which does not survive pickling
+        state = self.__dict__.copy()
+        state['_site_masks'] = {}
+        return state
 
     def _simulated_cleave(self, protease_combination):
-        """Helper method to simulate cleavage of sequence with a combination of proteases."""
-        simulator = DigestionSimulator(self.original_sequence, protease_combination, self.min_peptide_length)
-        return set(simulator.extract_unique_peptide_sequences())
+        """
+        Helper method to simulate cleavage of sequence with a combination of proteases.
+
+        The peptides are read from the site masks of the members, so no peptide tree is
+        built. The result equals DigestionSimulator(...).extract_unique_peptide_sequences().
+        """
+        if self.use_cache:
+            key = digest_key(self.original_sequence, protease_combination,
+                             self.min_peptide_length)
+            cached = digest_cache.get(key)
+            if cached is not None:
+                return set(cached)
+            cleaved_peptides_set = self._cleave_from_site_masks(protease_combination)
+            digest_cache.put(key, cleaved_peptides_set)
+            return cleaved_peptides_set
+        return self._cleave_from_site_masks(protease_combination)
+
+    def _cleave_from_site_masks(self, protease_combination):
+        site_masks = [self._site_mask(protease) for protease in protease_combination]
+        starts, ends = intervals_from_site_masks(site_masks, len(self.original_sequence),
+                                                 min_length=self.min_peptide_length)
+        sequence = self.original_sequence
+        return {sequence[start:end] for start, end in zip(starts.tolist(), ends.tolist())}
 
-    def predict(self, peptide_sequences):
+    def predict(self, peptide_sequences, workers=None, chunks_per_worker=4):
         """
         Predicts the potential proteases responsible for generating observed peptide sequences.
         
         Parameters:
         - peptide_sequences (list): List of peptide sequences observed after digestion.
+        - workers (int, optional): Number of worker processes that score the combinations.
+          Default is None, which scores them serially, 0 uses all cores. The result is the same
+          for any number of workers.
+        - chunks_per_worker (int, optional): Number of chunks per worker when workers is set.
+          Default is 4.
         
         Returns:
-        - DataFrame: A pandas DataFrame sorted by score. Each row contains the combination of proteases,
-          the number of matched peptides, and the overall score.
+        - DataFrame: A pandas DataFrame sorted by score. Each row contains the combination of
+          proteases, the number of matched peptides, and the overall score.
         """
-        identified_proteases = []
         peptide_sequences_set = set(peptide_sequences)
-        total_peptide_count = len(peptide_sequences_set)
+        indexed_combinations = list(enumerate(
+            indices
+            for i in range(1, len(self.proteases) + 1)
+            for indices in combinations(range(len(self.proteases)), i)
+        ))
 
-        for i in range(1, len(self.proteases) + 1):  
-            for protease_combination in combinations(self.proteases, i):
-                names = '+'.join([p.name for p in protease_combination])
-                cleaved_peptides_set = self._simulated_cleave(protease_combination)
-                
-                matched_peptides_count = len(cleaved_peptides_set.intersection(peptide_sequences_set))
-                unmatched_predicted_count = len(cleaved_peptides_set) - matched_peptides_count
-                probability = matched_peptides_count / total_peptide_count if total_peptide_count else 0
-                
-                penalty = self.lambda_penalty * unmatched_predicted_count / len(cleaved_peptides_set)
-                score = probability - penalty
-                
-                identified_proteases.append((names, matched_peptides_count, score))
+        if workers is None or workers == 1:
+            rows = _score_chunk(self, indexed_combinations, peptide_sequences_set)
+        else:
+            workers = workers or os.cpu_count()
+            n_chunks = workers * chunks_per_worker
+            # round robin, so that every chunk gets the same mix of small and large ones
+            chunks = [indexed_combinations[j::n_chunks] for j in range(n_chunks)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunk_rows = executor.map(_score_chunk, [self] * n_chunks, chunks,
+                                          [peptide_sequences_set] * n_chunks)
+                rows = sorted(row for chunk in chunk_rows for row in chunk)
+
+        identified_proteases = [(names, matched_peptides_count, score)
+                                for _, names, matched_peptides_count, score in rows]
 
         # Convert to a DataFrame
-        df = pd.DataFrame(identified_proteases, columns=['Protease', 'Matched_Peptides', 'Score'])
+        df = pd.DataFrame(identified_proteases,
+                          columns=['Protease', 'Matched_Peptides', 'Score'])
         
         # Sort by Score in descending order
         df = df.sort_values(by='Score', ascending=False).reset_index(drop=True)
         
         return df
+
+    def predict_samples(self, samples):
+        """
+        Predicts the potential proteases for many samples of observed peptides at once.
+
+        Every combination is digested once. The digests are stored as a combination x
+        peptide incidence matrix over the peptides observed in any sample, and the samples as a
+        sample x peptide matrix. One matrix product then gives the matched counts of every
+        combination in every sample. Peptides that were not observed in any sample only
+        contribute to the number of predicted peptides, so they need no column.
+
+        Parameters:
+        - samples (dict or list): Observed peptide sequences per sample, either a dict mapping
+          sample names to lists of peptides or a list of lists, in which case the samples are
+          named by position.
+
+        Returns:
+        - DataFrame: A long-format pandas DataFrame with the columns Sample, Protease,
+          Matched_Peptides and Score. The rows of each sample equal the result of predict for
+          that sample.
+        """
+        if isinstance(samples, dict):
+            sample_names = list(samples.keys())
+            sample_sets = [set(peptides) for peptides in samples.values()]
+        else:
+            sample_names = list(range(len(samples)))
+            sample_sets = [set(peptides) for peptides in samples]
+
+        observed = sorted(set().union(*sample_sets))
+        vocabulary = {peptide: i for i, peptide in enumerate(observed)}
+        sample_matrix = np.zeros((len(sample_sets), len(vocabulary)), dtype=np.float32)
+        for row, peptides in enumerate(sample_sets):
+            sample_matrix[row, [vocabulary[peptide] for peptide in peptides]] = 1
+
+        names = []
+        incidence = []
+        cleaved_counts = []
+        for i in range(1, len(self.proteases) + 1):
+            for protease_combination in combinations(self.proteases, i):
+                names.append('+'.join([p.name for p in protease_combination]))
+                cleaved_peptides_set = self._simulated_cleave(protease_combination)
+                incidence.append([vocabulary[p] for p in cleaved_peptides_set
+                                  if p in vocabulary])
+                cleaved_counts.append(len(cleaved_peptides_set))
+
+        incidence_matrix = np.zeros((len(names), len(vocabulary)), dtype=np.float32)
+        for row, columns in enumerate(incidence):
+            incidence_matrix[row, columns] = 1
+
+        # counts stay exact in float32 below 2**24 peptides
+        matched = np.rint(incidence_matrix @ sample_matrix.T).astype(np.int64)
+        totals = np.array([len(peptides) for peptides in sample_sets])
+        cleaved_counts = np.array(cleaved_counts)[:, None]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            probability = np.where(totals > 0, matched / totals, 0)
+            penalty = self.lambda_penalty * (cleaved_counts - matched) / cleaved_counts
+            penalty = np.where(cleaved_counts > 0, penalty, 0)
+        scores = probability - penalty
+
+        frames = []
+        for column, sample_name in enumerate(sample_names):
+            df = pd.DataFrame({'Protease': names, 'Matched_Peptides': matched[:, column],
+                               'Score': scores[:, column]})
+            df = df.sort_values(by='Score', ascending=False).reset_index(drop=True)
+            df.insert(0, 'Sample', sample_name)
+            frames.append(df)
+
+        if not frames:
+            return pd.DataFrame(columns=['Sample', 'Protease', 'Matched_Peptides', 'Score'])
+        return pd.concat(frames, ignore_index=True)
+
+    def _score(self, cleaved_peptides_set, peptide_sequences_set):
+        """Helper method returning the matched peptide count and the score of a combination."""
+        total_peptide_count = len(peptide_sequences_set)
+        matched_peptides_count = len(cleaved_peptides_set.intersection(peptide_sequences_set))
+        unmatched_predicted_count = len(cleaved_peptides_set) - matched_peptides_count
+        probability = 0
+        if total_peptide_count:
+            probability = matched_peptides_count / total_peptide_count
+
+        penalty = 0
+        if cleaved_peptides_set:
+            cleaved_count = len(cleaved_peptides_set)
+            penalty = self.lambda_penalty * unmatched_predicted_count / cleaved_count
+        score = probability - penalty
+        return matched_peptides_count, score
+
+    def _score_bound(self, cleaved_peptides_set, reachable_peptides_set,
+                     peptide_sequences_set):
+        """
+        Helper method returning an upper bound on the score of every superset of a
+        combination.
+
+        Adding proteases never removes peptides, so the peptides of any superset lie between
+        the peptides of the combination and the peptides of the combination together with
+        all remaining proteases. Hence the matched count is at most the one of the latter
+        and the unmatched fraction is at least 1 - max_matched / len(cleaved_peptides_set).
+        """
+        total_peptide_count = len(peptide_sequences_set)
+        max_matched_count = len(reachable_peptides_set.intersection(peptide_sequences_set))
+        probability_bound = 0
+        if total_peptide_count:
+            probability_bound = max_matched_count / total_peptide_count
+        if cleaved_peptides_set:
+            min_unmatched_fraction = max(0, 1 - max_matched_count / len(cleaved_peptides_set))
+            penalty_bound = self.lambda_penalty * min_unmatched_fraction
+        else:
+            penalty_bound = 0
+        return probability_bound - penalty_bound
+
+    def search(self, peptide_sequences, top_k=10):
+        """
+        Finds the top_k protease combinations by branch and bound instead of enumeration.
+
+        The combinations are searched depth first, each combination extended only by
+        proteases that come later in the list. A subtree is pruned when the upper bound on
+        the score of its combinations is below the k-th best score found so far, so the
+        result is the exact top_k of predict without scoring the whole power set. The number
+        of visited and pruned combinations is stored in the search_statistics attribute.
+
+        Parameters:
+        - peptide_sequences (list): List of peptide sequences observed after digestion.
+        - top_k (int, optional): Number of combinations to return. Default is 10.
+
+        Returns:
+        - DataFrame: A pandas DataFrame with the top_k rows of predict, sorted by score.
+        """
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1.")
+        peptide_sequences_set = set(peptide_sequences)
+        n = len(self.proteases)
+        best = []
+        visited = pruned_subtrees = pruned = 0
+
+        stack = [((), 0)]
+        while stack:
+            indices, next_index = stack.pop()
+            protease_combination = [self.proteases[i] for i in indices]
+            cleaved_peptides_set = set()
+            if indices:
+                visited += 1
+                cleaved_peptides_set = self._simulated_cleave(protease_combination)
+                names = '+'.join([p.name for p in protease_combination])
+                matched_peptides_count, score = self._score(cleaved_peptides_set,
+                                                            peptide_sequences_set)
+                entry = (score, -visited, names, matched_peptides_count)
+                if len(best) < top_k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+
+            remaining = n - next_index
+            if remaining == 0:
+                continue
+            if len(best) == top_k:
+                # bound digests are never scored, so they bypass the digest cache
+                reachable_peptides_set = self._cleave_from_site_masks(
+                    protease_combination + list(self.proteases[next_index:]))
+                bound = self._score_bound(cleaved_peptides_set, reachable_peptides_set,
+                                          peptide_sequences_set)
+                # the tolerance keeps rounding from putting the bound below an equal score
+                if bound < best[0][0] - 1e-12:
+                    pruned_subtrees += 1
+                    pruned += 2 ** remaining - 1
+                    continue
+            for j in reversed(range(next_index, n)):
+                stack.append((indices + (j,), j + 1))
+
+        self.search_statistics = {
+            'combinations': 2 ** n - 1,
+            'visited': visited,
+            'pruned_subtrees': pruned_subtrees,
+            'pruned': pruned,
+        }
+
+        identified_proteases = [(names, matched, score) for score, _, names, matched in best]
+        df = pd.DataFrame(identified_proteases,
+                          columns=['Protease', 'Matched_Peptides', 'Score'])
+        df = df.sort_values(by='Score', ascending=False).reset_index(drop=True)
+        return df
@@ -0,0 +1,135 @@
+import numpy as np
+
+
+# Separates the sequences of a proteome, so that no match spans two sequences.
+SEPARATOR = b'\x00'
+
+
+def build_suffix_array(codes):
+    """
+    Builds the suffix array of an encoded text by prefix doubling.
+
+    Each round sorts the suffixes by the ranks of their first k and next k characters,
+    so at most log2 of the longest repeat rounds of one argsort each are needed.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        The encoded text.
+
+    Returns
+    -------
+    numpy.ndarray
+        The start positions of the suffixes in lexicographic order.
+    """
+    n = len(codes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # dense ranks below n keep the combined keys below (n + 1) ** 2
+    rank = np.unique(codes, return_inverse=True)[1].astype(np.int64).ravel()
+    k = 1
+    while True:
+        second = np.full(n, -1, dtype=np.int64)
+        second[:n - k] = rank[k:]
+        keys = rank * (n + 1) + (second + 1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        sorted_rank = np.concatenate(([0], np.cumsum(sorted_keys[1:] != sorted_keys[:-1])))
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = sorted_rank
+        if sorted_rank[-1] == n - 1 or k >= n:
+            return order
+        k *= 2
+
+
+class SuffixArray:
+    def __init__(self, sequences):
+        """
+        This class represents a suffix array over one sequence or a whole proteome.
+
+        It is built once and then finds all occurrences of a peptide with two binary
+        searches, in O(len(peptide) * log(N)) for a text of N residues.
+
+        Parameters
+        ----------
+        sequences : str or list of str
+            The sequence to index, or the sequences of a proteome. The sequences of a
+            proteome are joined with a separator that no peptide contains.
+        """
+        if isinstance(sequences, str):
+            sequences = [sequences]
+        else:
+            sequences = list(sequences)
+        encoded = [sequence.encode('ascii') for sequence in sequences]
+        self.text = SEPARATOR.join(encoded)
+        self.starts = np.cumsum([0] + [len(sequence) + 1 for sequence in encoded[:-1]])
+        self.suffix_array = build_suffix_array(np.frombuffer(self.text, dtype=np.uint8))
+
+    def _bound(self, pattern, upper):
+        text, suffix_array, m = self.text, self.suffix_array, len(pattern)
+        lo, hi = 0, len(suffix_array)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = suffix_array[mid]
+            prefix = text[start:start + m]
+            if prefix < pattern or (upper and prefix == pattern):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, peptide):
+        """
+        Finds all occurrences of the given peptide, including overlapping ones.
+
+        Parameters
+        ----------
+        peptide : str
+            The peptide to search for.
+
+        Returns
+        -------
+        numpy.ndarray
+            The sorted positions of the peptide in the joined text. For a single sequence
+            these are the positions in that sequence.
+        """
+        pattern = peptide.encode('ascii')
+        lo = self._bound(pattern, upper=False)
+        hi = self._bound(pattern, upper=True)
+        return np.sort(self.suffix_array[lo:hi])
+
+    def count(self, peptide):
+        """
+        Counts the occurrences of the given peptide.
+
+        Parameters
+        ----------
+        peptide : str
+            The peptide to search for.
+
+        Returns
+        -------
+        int
+            The number of occurrences.
+        """
+        pattern = peptide.encode('ascii')
+        return self._bound(pattern, upper=True) - self._bound(pattern, upper=False)
+
+    def locate(self, peptide):
+        """
+        Finds all occurrences of the given peptide as positions within the indexed sequences.
+
+        Parameters
+        ----------
+        peptide : str
+            The peptide to search for.
+
+        Returns
+        -------
+        list of tuple of int
+            The (sequence index, offset) of every occurrence, sorted.
+        """
+        positions = self.find(peptide)
+        indices = np.searchsorted(self.starts, positions, side='right') - 1
+        return list(zip(indices.tolist(), (positions - self.starts[indices]).tolist()))
@@ -0,0 +1,213 @@
+import argparse
+import os
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+from .DigestCache import digest_key, digest_method
+from .DigestStore import DigestStore
+from .DigestionSimulator import DigestionSimulator
+from .fasta import read_fasta
+from .proteases import available_proteases
+
+
+def digest_records(records, protease_names, min_peptide_length=3, max_depth=100,
+                   engine='interval', max_missed_cleavages=None):
+    """
+    Digests a chunk of FASTA records. This is the task run by each worker process.
+
+    Parameters
+    ----------
+    records : list of tuple of str
+        The (accession, sequence) records to digest.
+    protease_names : list of str
+        The names of the proteases in available_proteases.
+    min_peptide_length : int, optional
+        Peptides must be longer than this. The default is 3.
+    max_depth : int, optional
+        The maximum depth of the peptide tree. The default is 100.
+    engine : str, optional
+        The DigestionSimulator engine. The default is 'interval'.
+    max_missed_cleavages : int, optional
+        The DigestionSimulator max_missed_cleavages. The default is None.
+
+    Returns
+    -------
+    list of tuple
+        The accession and the sorted unique peptides of each record.
+    """
+    proteases = [available_proteases[name]() for name in protease_names]
+    results = []
+    for accession, sequence in records:
+        simulator = DigestionSimulator(sequence, proteases,
+                                       min_peptide_length=min_peptide_length,
+                                       max_depth=max_depth, engine=engine, use_cache=False,
+                                       max_missed_cleavages=max_missed_cleavages)
+        results.append((accession, sorted(simulator.extract_unique_peptide_sequences())))
+    return results
+
+
+def chunk_records(records, chunk_size):
+    """
+    Groups the given records into lists of at most chunk_size records.
+
+    Parameters
+    ----------
+    records : iterable of tuple of str
+        The (accession, sequence) records.
+    chunk_size : int
+        The maximum number of records per chunk.
+
+    Yields
+    ------
+    list of tuple of str
+        The next chunk of records.
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_peptides(f, accession, peptides):
+    for peptide in peptides:
+        f.write(f"{accession}\t{peptide}\n")
+
+
+def _write_results(f, futures, store=None):
+    n_records = 0
+    for future in futures:
+        results = future.result()
+        for accession, peptides in results:
+            _write_peptides(f, accession, peptides)
+            n_records += 1
+        if store is not None:
+            store.put_many(zip(futures[future], (peptides for _, peptides in results)))
+    return n_records
+
+
+def digest_fasta(file_name, protease_names, output_file, min_peptide_length=3, max_depth=100,
+                 engine='interval', workers=None, chunk_size=64, max_pending=None,
+                 store_file=None, max_missed_cleavages=None):
+    """
+    Digests every record of a FASTA file on a process pool and streams the peptides to disk.
+
+    Records are read lazily and sent to the workers in chunks. At most max_pending chunks
+    are in flight at any time, so peak memory does not depend on the size of the input.
+    Each chunk is written as soon as it finishes, so the output is not in input order.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the FASTA file.
+    protease_names : list of str
+        The names of the proteases in available_proteases.
+    output_file : str
+        The path of the tab-separated output file with columns accession and peptide.
+    min_peptide_length : int, optional
+        Peptides must be longer than this. The default is 3.
+    max_depth : int, optional
+        The maximum depth of the peptide tree. The default is 100.
+    engine : str, optional
+        The DigestionSimulator engine. The default is 'interval'.
+    workers : int, optional
+        The number of worker processes. The default is None, which uses all cores.
+    chunk_size : int, optional
+        The number of records per task. The default is 64.
+    max_pending : int, optional
+        The maximum number of chunks in flight. The default is None, which is twice the
+        number of workers.
+    store_file : str, optional
+        The path of a DigestStore database. Records whose digest is stored are written
+        without digesting them, and new digests are stored in one transaction per chunk.
+        The default is None.
+    max_missed_cleavages : int, optional
+        The DigestionSimulator max_missed_cleavages. The default is None.
+
+    Returns
+    -------
+    int
+        The number of records digested.
+    """
+    unknown = [name for name in protease_names if name not in available_proteases]
+    if unknown:
+        raise ValueError(f"Unknown proteases: {', '.join(unknown)}. "
+                         f"Use any of {', '.join(available_proteases)}.")
+
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or 2 * workers
+    proteases = [available_proteases[name]() for name in protease_names]
+    method = digest_method(engine, max_missed_cleavages=max_missed_cleavages)
+    store = DigestStore(store_file) if store_file is not None else None
+    n_records = 0
+
+    try:
+        with open(output_file, 'w') as f, ProcessPoolExecutor(max_workers=workers) as executor:
+            f.write("accession\tpeptide\n")
+            pending = {}
+            for chunk in chunk_records(read_fasta(file_name), chunk_size):
+                keys = None
+                if store is not None:
+                    keys = [digest_key(sequence, proteases, min_peptide_length, max_depth,
+                                       method)
+                            for _, sequence in chunk]
+                    stored = store.get_many(keys)
+                    for (accession, _), key in zip(chunk, keys):
+                        if key in stored:
+                            _write_peptides(f, accession, sorted(stored[key]))
+                            n_records += 1
+                    misses = [(record, key) for record, key in zip(chunk, keys)
+                              if key not in stored]
+                    if not misses:
+                        continue
+                    chunk = [record for record, _ in misses]
+                    keys = [key for _, key in misses]
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    finished = {future: pending.pop(future) for future in done}
+                    n_records += _write_results(f, finished, store)
+                future = executor.submit(digest_records, chunk, list(protease_names),
+                                         min_peptide_length, max_depth, engine,
+                                         max_missed_cleavages)
+                pending[future] = keys
+            wait(pending)
+            n_records += _write_results(f, pending, store)
+    finally:
+        if store is not None:
+            store.close()
+
+    return n_records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Digest every protein of a FASTA file.")
+    parser.add_argument('fasta', help="The input FASTA file.")
+    parser.add_argument('-p', '--proteases', nargs='+', required=True,
+                        choices=list(available_proteases),
+                        help="The proteases to digest with.")
+    parser.add_argument('-o', '--output', required=True, help="The output TSV file.")
+    parser.add_argument('-m', '--min-peptide-length', type=int, default=3)
+    parser.add_argument('-d', '--max-depth', type=int, default=100)
+    parser.add_argument('-e', '--engine', choices=['interval', 'dag', 'tree'],
+                        default='interval')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('-c', '--chunk-size', type=int, default=64)
+    parser.add_argument('-k', '--max-missed-cleavages', type=int, default=None,
+                        help="List only peptides with at most this many missed cleavages.")
+    parser.add_argument('-s', '--store', default=None,
+                        help="A SQLite digest store to reuse and extend.")
+    args = parser.parse_args(argv)
+
+    n_records = digest_fasta(args.fasta, args.proteases, args.output,
+                             min_peptide_length=args.min_peptide_length,
+                             max_depth=args.max_depth, engine=args.engine,
+                             workers=args.workers, chunk_size=args.chunk_size,
+                             store_file=args.store,
+                             max_missed_cleavages=args.max_missed_cleavages)
+    print(f"Digested {n_records} records into {args.output}")
+
+
+if __name__ == '__main__':
+    main()
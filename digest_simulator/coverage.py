@@ -0,0 +1,152 @@
+import numpy as np
+
+
+def interval_arrays(intervals):
+    """
+    Converts (start, end) intervals into sorted start and end arrays.
+
+    Parameters
+    ----------
+    intervals : iterable of tuple of int
+        The (start, end) intervals of the peptides.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The start and end positions, sorted by start and then end.
+    """
+    pairs = np.array(sorted(set(intervals)), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def coverage_matrix(starts, ends, sequence_length):
+    """
+    Builds the peptide x residue coverage matrix.
+
+    Parameters
+    ----------
+    starts : numpy.ndarray
+        The start positions of the peptides.
+    ends : numpy.ndarray
+        The end positions of the peptides.
+    sequence_length : int
+        The length of the sequence.
+
+    Returns
+    -------
+    numpy.ndarray
+        A uint8 matrix with one row per peptide, 1 where the peptide covers the residue.
+    """
+    positions = np.arange(sequence_length)
+    starts = np.asarray(starts)[:, None]
+    ends = np.asarray(ends)[:, None]
+    return ((positions >= starts) & (positions < ends)).astype(np.uint8)
+
+
+def coverage_depth(starts, ends, sequence_length):
+    """
+    Counts how many peptides cover every residue.
+
+    Parameters
+    ----------
+    starts : numpy.ndarray
+        The start positions of the peptides.
+    ends : numpy.ndarray
+        The end positions of the peptides.
+    sequence_length : int
+        The length of the sequence.
+
+    Returns
+    -------
+    numpy.ndarray
+        The number of peptides covering each residue.
+    """
+    changes = np.zeros(sequence_length + 1, dtype=np.int64)
+    np.add.at(changes, starts, 1)
+    np.add.at(changes, ends, -1)
+    return np.cumsum(changes[:-1])
+
+
+def coverage_image(starts, ends, sequence_length, width=1200, max_row_height=8):
+    """
+    Renders the coverage matrix as a grayscale image for display as a heatmap.
+
+    Sequences shorter than width get columns of width // sequence_length pixels. Longer
+    sequences are binned into width columns of consecutive residues, and a peptide is
+    drawn in every column where it covers at least one residue, so even the shortest
+    peptide stays visible. The binned image is built from the first and last column of
+    each peptide, without the full peptide x residue matrix.
+
+    Parameters
+    ----------
+    starts : numpy.ndarray
+        The start positions of the peptides.
+    ends : numpy.ndarray
+        The end positions of the peptides.
+    sequence_length : int
+        The length of the sequence.
+    width : int, optional
+        The approximate width of the image in pixels, and the maximum number of columns.
+        The default is 1200.
+    max_row_height : int, optional
+        The maximum height of a peptide row in pixels. The default is 8.
+
+    Returns
+    -------
+    numpy.ndarray
+        A uint8 image, black where a peptide covers a residue and white elsewhere.
+    """
+    width = max(1, width)
+    if sequence_length > width:
+        starts = np.asarray(starts, dtype=np.int64)[:, None]
+        ends = np.asarray(ends, dtype=np.int64)[:, None]
+        columns = np.arange(width)
+        # column b holds the residues r with r * width // sequence_length == b
+        matrix = ((columns >= starts * width // sequence_length)
+                  & (columns <= (ends - 1) * width // sequence_length)).astype(np.uint8)
+        return 255 - 255 * matrix
+
+    matrix = coverage_matrix(starts, ends, sequence_length)
+    column_width = max(1, width // max(sequence_length, 1))
+    row_height = min(column_width, max_row_height)
+    image = 255 - 255 * matrix
+    return np.repeat(np.repeat(image, row_height, axis=0), column_width, axis=1)
+
+
+def save_coverage(file_name, starts, ends, sequence_length):
+    """
+    Saves peptide intervals as compressed run-length rows, one (start, end) pair per peptide.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the .npz file.
+    starts : numpy.ndarray
+        The start positions of the peptides.
+    ends : numpy.ndarray
+        The end positions of the peptides.
+    sequence_length : int
+        The length of the sequence.
+    """
+    dtype = np.uint32 if sequence_length < 2**32 else np.uint64
+    np.savez_compressed(file_name, starts=np.asarray(starts, dtype=dtype),
+                        ends=np.asarray(ends, dtype=dtype), sequence_length=sequence_length)
+
+
+def load_coverage(file_name):
+    """
+    Loads peptide intervals saved by save_coverage.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the .npz file.
+
+    Returns
+    -------
+    tuple
+        The start and end arrays and the sequence length.
+    """
+    with np.load(file_name) as data:
+        starts, ends = data['starts'].astype(np.int64), data['ends'].astype(np.int64)
+        return starts, ends, int(data['sequence_length'])
@@ -0,0 +1,199 @@
+import gzip
+import mmap
+import os
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Characters dropped from the sequence lines of a record.
+WHITESPACE = b' \t\r\n'
+
+
+def _record_spans(data, offset=0):
+    """Yields the (start, end) byte span of every record that starts in data."""
+    start = data.find(b'>', offset)
+    while start != -1:
+        end = data.find(b'\n>', start)
+        if end == -1:
+            yield start, len(data)
+            return
+        yield start, end + 1
+        start = end + 1
+
+
+def _parse_header(record):
+    header_end = record.find(b'\n')
+    header = record[1:] if header_end == -1 else record[1:header_end]
+    words = header.split(maxsplit=1)
+    accession = words[0].decode(errors='replace') if words else ''
+    return accession, header_end
+
+
+def _parse_record(record):
+    accession, header_end = _parse_header(record)
+    if header_end == -1:
+        return accession, ''
+    # like encode_sequence, non-ASCII bytes become a character that is no residue
+    sequence = record[header_end + 1:].translate(None, WHITESPACE)
+    return accession, sequence.decode('ascii', errors='replace')
+
+
+def is_gzip(file_name):
+    """
+    Checks whether the given file is gzip compressed.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the file.
+
+    Returns
+    -------
+    bool
+        True if the file starts with the gzip magic number.
+    """
+    with open(file_name, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def _read_mapped_fasta(file_name):
+    if os.path.getsize(file_name) == 0:
+        return
+    with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start, end in _record_spans(mm):
+            yield _parse_record(mm[start:end])
+
+
+def _read_streamed_fasta(f, block_size):
+    buffer = bytearray()
+    while True:
+        block = f.read(block_size)
+        if not block:
+            break
+        buffer.extend(block)
+        last = buffer.rfind(b'\n>')
+        if last == -1:
+            continue
+        # Everything before the last record start is made of complete records.
+        for start, end in _record_spans(buffer[:last + 1]):
+            yield _parse_record(bytes(buffer[start:end]))
+        del buffer[:last + 1]
+    for start, end in _record_spans(buffer):
+        yield _parse_record(bytes(buffer[start:end]))
+
+
+def read_fasta(file_name, block_size=1 << 20):
+    """
+    Reads the records of a FASTA file one at a time.
+
+    Plain files are memory-mapped and every record is cut out of the map in one piece.
+    Gzip files are decompressed as a stream in blocks of block_size bytes.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the FASTA file, optionally gzip compressed.
+    block_size : int, optional
+        The number of decompressed bytes read at a time from gzip files. The default is 1 MiB.
+
+    Yields
+    ------
+    tuple of str
+        The accession, the first word of the header line, and the sequence of each record.
+    """
+    if is_gzip(file_name):
+        with gzip.open(file_name, 'rb') as f:
+            yield from _read_streamed_fasta(f, block_size)
+    else:
+        yield from _read_mapped_fasta(file_name)
+
+
+def index_fasta(file_name):
+    """
+    Builds an offset index of the records of an uncompressed FASTA file.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the FASTA file.
+
+    Returns
+    -------
+    dict
+        Maps every accession to the (offset, length) in bytes of its record.
+    """
+    if is_gzip(file_name):
+        raise ValueError("Cannot index a gzip compressed FASTA file. Decompress it first.")
+    index = {}
+    if os.path.getsize(file_name) == 0:
+        return index
+    with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start, end in _record_spans(mm):
+            header_end = mm.find(b'\n', start, end)
+            accession, _ = _parse_header(mm[start:end if header_end == -1 else header_end])
+            index[accession] = (start, end - start)
+    return index
+
+
+def write_fasta_index(index, index_file):
+    """
+    Writes an offset index built by index_fasta to a tab-separated file.
+
+    Parameters
+    ----------
+    index : dict
+        Maps every accession to the (offset, length) of its record.
+    index_file : str
+        The path of the index file.
+    """
+    with open(index_file, 'w') as f:
+        for accession, (offset, length) in index.items():
+            f.write(f"{accession}\t{offset}\t{length}\n")
+
+
+def read_fasta_index(index_file):
+    """
+    Reads an offset index written by write_fasta_index.
+
+    Parameters
+    ----------
+    index_file : str
+        The path of the index file.
+
+    Returns
+    -------
+    dict
+        Maps every accession to the (offset, length) of its record.
+    """
+    index = {}
+    with open(index_file) as f:
+        for line in f:
+            accession, offset, length = line.rstrip('\n').split('\t')
+            index[accession] = (int(offset), int(length))
+    return index
+
+
+def fetch_fasta_record(file_name, index, accession):
+    """
+    Reads the sequence of one accession using an offset index.
+
+    Only the bytes of the requested record are read from the file.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the FASTA file.
+    index : dict
+        The offset index built by index_fasta.
+    accession : str
+        The accession to read.
+
+    Returns
+    -------
+    str
+        The sequence of the record.
+    """
+    offset, length = index[accession]
+    with open(file_name, 'rb') as f:
+        f.seek(offset)
+        return _parse_record(f.read(length))[1]
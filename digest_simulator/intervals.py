@@ -0,0 +1,245 @@
+from itertools import chain, islice
+
+import numpy as np
+
+from .Protease import encode_sequence
+
+
+def find_site_masks(sequence, proteases):
+    """
+    Finds the cleavage site mask of every protease in the given sequence.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to search for cleavage sites.
+    proteases : list of Protease
+        The proteases to find the cleavage sites for.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        The boolean site mask of each protease, in the order of ``proteases``.
+        See Protease.site_mask.
+    """
+    codes = encode_sequence(sequence)
+    return [protease.site_mask(codes) for protease in proteases]
+
+
+def intervals_from_site_masks(site_masks, sequence_length, min_length=0):
+    """
+    Computes the (start, end) intervals of all peptides reachable from the given site masks.
+
+    A peptide is reachable when it starts at the N-terminus or a site, ends at the
+    C-terminus or a site, and each end is the cut of a protease that has no site inside
+    the peptide. Such a peptide always ends at the next site of some protease, so every
+    start has at most one candidate end per protease. The starts are the sites of the
+    OR of all masks and the ends are looked up in each mask with one searchsorted.
+
+    Parameters
+    ----------
+    site_masks : list of numpy.ndarray
+        The boolean site mask of each protease, see Protease.site_mask.
+    sequence_length : int
+        The length of the sequence the masks were computed for.
+    min_length : int, optional
+        Peptides must be longer than this. The default is 0.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The start and end positions of the intervals, sorted by start and then end,
+        excluding the full sequence.
+    """
+    n = sequence_length
+    if not len(site_masks):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    union = np.logical_or.reduce(site_masks)
+    starts = np.concatenate(([0], np.flatnonzero(union) + 1))
+
+    ends = np.empty((len(site_masks), len(starts)), dtype=np.int64)
+    limit = np.full(len(starts), -1, dtype=np.int64)
+    for j, mask in enumerate(site_masks):
+        sites = np.append(np.flatnonzero(mask) + 1, n)
+        ends[j] = sites[np.searchsorted(sites[:-1], starts, side='right')]
+        # a start can only be cut by a protease that has a site there
+        cuts_start = np.concatenate(([True], mask[starts[1:] - 1]))
+        limit = np.maximum(limit, np.where(cuts_start, ends[j], -1))
+
+    valid = (ends <= limit) & (ends - starts > min_length) & ~((starts == 0) & (ends == n))
+    keys = np.unique((starts * (n + 1) + ends)[valid])
+    return keys // (n + 1), keys % (n + 1)
+
+
+def generate_peptide_intervals(sequence, proteases, min_length=0, site_masks=None):
+    """
+    Generates the (start, end) intervals of all peptides reachable by the given proteases.
+
+    The cleavage sites are found once on the full sequence and the run time is
+    proportional to the number of sites times the number of proteases, see
+    intervals_from_site_masks.
+
+    The peptide set equals the one of ``generate_peptide_tree`` as long as ``max_depth``
+    does not truncate the tree.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to digest.
+    proteases : list of Protease
+        The proteases to digest the sequence with.
+    min_length : int, optional
+        Peptides must be longer than this. The default is 0.
+    site_masks : list of numpy.ndarray, optional
+        Precomputed site masks of each protease. The default is None.
+
+    Returns
+    -------
+    list of tuple of int
+        The sorted (start, end) intervals, excluding the full sequence.
+    """
+    if site_masks is None:
+        site_masks = find_site_masks(sequence, proteases)
+    starts, ends = intervals_from_site_masks(site_masks, len(sequence), min_length=min_length)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def missed_cleavage_intervals(site_masks, sequence_length, max_missed_cleavages, min_length=0):
+    """
+    Computes the (start, end) intervals of all peptides with at most k missed cleavages.
+
+    The sites of all proteases are merged into one sorted array of boundaries, framed by
+    the termini. A peptide with m missed cleavages spans m + 1 consecutive boundaries, so
+    the peptides are the windows boundaries[:-(m + 1)], boundaries[m + 1:] for m up to k,
+    and their number is at most (k + 1) times the number of sites.
+
+    Parameters
+    ----------
+    site_masks : list of numpy.ndarray
+        The boolean site mask of each protease, see Protease.site_mask.
+    sequence_length : int
+        The length of the sequence the masks were computed for.
+    max_missed_cleavages : int
+        The maximum number of sites inside a peptide.
+    min_length : int, optional
+        Peptides must be longer than this. The default is 0.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The start and end positions of the intervals, sorted by start and then end,
+        excluding the full sequence.
+    """
+    n = sequence_length
+    if max_missed_cleavages < 0:
+        raise ValueError("max_missed_cleavages must not be negative.")
+    if not len(site_masks):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    union = np.logical_or.reduce(site_masks)
+    boundaries = np.concatenate(([0], np.flatnonzero(union) + 1, [n]))
+    windows = range(1, min(max_missed_cleavages + 1, len(boundaries) - 1) + 1)
+    empty = [np.zeros(0, dtype=np.int64)]
+    starts = np.concatenate([boundaries[:-m] for m in windows] or empty)
+    ends = np.concatenate([boundaries[m:] for m in windows] or empty)
+
+    valid = (ends - starts > min_length) & ~((starts == 0) & (ends == n))
+    starts, ends = starts[valid], ends[valid]
+    order = np.lexsort((ends, starts))
+    return starts[order], ends[order]
+
+
+def generate_missed_cleavage_intervals(sequence, proteases, max_missed_cleavages, min_length=0,
+                                       site_masks=None):
+    """
+    Generates the (start, end) intervals of all peptides with at most k missed cleavages,
+    see missed_cleavage_intervals.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to digest.
+    proteases : list of Protease
+        The proteases to digest the sequence with.
+    max_missed_cleavages : int
+        The maximum number of sites inside a peptide.
+    min_length : int, optional
+        Peptides must be longer than this. The default is 0.
+    site_masks : list of numpy.ndarray, optional
+        Precomputed site masks of each protease. The default is None.
+
+    Returns
+    -------
+    list of tuple of int
+        The sorted (start, end) intervals, excluding the full sequence.
+    """
+    if site_masks is None:
+        site_masks = find_site_masks(sequence, proteases)
+    starts, ends = missed_cleavage_intervals(site_masks, len(sequence), max_missed_cleavages,
+                                             min_length=min_length)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def extract_interval_sequences(sequence, intervals):
+    """
+    Extracts the unique peptide sequences of the given intervals.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence the intervals refer to.
+    intervals : list of tuple of int
+        The (start, end) intervals of the peptides.
+
+    Returns
+    -------
+    set of str
+        The unique peptide sequences.
+    """
+    return {sequence[start:end] for start, end in intervals}
+
+
+def iter_interval_lines(sequence, intervals, start_line=0, max_lines=None):
+    """
+    Yields the sequence followed by one aligned line per interval, lazily.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence the intervals refer to.
+    intervals : iterable of tuple of int
+        The (start, end) intervals of the peptides.
+    start_line : int, optional
+        The number of lines to skip, for paginating. The default is 0.
+    max_lines : int, optional
+        The maximum number of lines to yield. The default is None, which yields all lines.
+
+    Yields
+    ------
+    str
+        The next line, without a line break.
+    """
+    n = len(sequence)
+    stop = None if max_lines is None else start_line + max_lines
+    for start, end in islice(chain([(0, n)], intervals), start_line, stop):
+        yield ' ' * start + sequence[start:end] + ' ' * (n - end)
+
+
+def draw_intervals(sequence, intervals):
+    """
+    Draws the given peptide intervals aligned below the sequence.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence the intervals refer to.
+    intervals : list of tuple of int
+        The (start, end) intervals of the peptides.
+
+    Returns
+    -------
+    str
+        The sequence followed by one aligned line per interval.
+    """
+    return '\n'.join(iter_interval_lines(sequence, intervals)) + '\n'
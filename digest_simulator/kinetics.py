@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+from .intervals import find_site_masks
+
+
+def site_rates(site_masks, rates):
+    """
+    Combines the cleavage rate constants of several proteases into one rate per site.
+
+    Parameters
+    ----------
+    site_masks : list of numpy.ndarray
+        The boolean site mask of each protease, see Protease.site_mask.
+    rates : float or list
+        The first-order rate constant at which a protease cuts one of its sites. Either
+        one float for all proteases, or one entry per protease that is a float or an array
+        with the rate of every position of its site mask.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The sorted sites, as positions in the sequence, and the sum of the rates of the
+        proteases that recognize each of them.
+    """
+    if np.isscalar(rates):
+        rates = [rates] * len(site_masks)
+    if len(rates) != len(site_masks):
+        raise ValueError("Give one rate per protease.")
+    if not len(site_masks):
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    total = np.zeros(len(site_masks[0]))
+    for mask, rate in zip(site_masks, rates):
+        rate = np.broadcast_to(np.asarray(rate, dtype=np.float64), mask.shape)
+        if np.any(rate < 0):
+            raise ValueError("Rates must not be negative.")
+        total += np.where(mask, rate, 0)
+    union = np.logical_or.reduce(site_masks)
+    sites = np.flatnonzero(union)
+    return sites + 1, total[sites]
+
+
+def kinetic_abundances(sites, rates, sequence_length, times, max_missed_cleavages=None,
+                       min_length=0, min_abundance=None, block_size=None):
+    """
+    Computes the abundance of every (start, end) species over time.
+
+    Every site is cut at its own first-order rate, independently of the species that
+    contains it. The linear system of rate equations over the species then has the
+    closed-form solution
+
+        x(start, end, t) = c(start, t) * c(end, t) * exp(-t * sum of the inner rates)
+
+    with c(site, t) = 1 - exp(-rate * t) and c = 1 at the termini, which is evaluated
+    with prefix sums of the rates, without step errors.
+
+    The species are evaluated one span of sites at a time, in blocks of block_size, and
+    filtered per block, so memory is bounded by the block and the kept species rather
+    than by all sites squared. For a fixed start, c(start, t) * exp(-t * inner rates)
+    bounds the abundance of every longer species and never increases with the span, so
+    a start is dropped as soon as that bound falls to min_abundance.
+
+    Parameters
+    ----------
+    sites : numpy.ndarray
+        The sorted sites, as positions in the sequence.
+    rates : numpy.ndarray
+        The rate of every site, see site_rates.
+    sequence_length : int
+        The length of the sequence.
+    times : array-like of float
+        The time points.
+    max_missed_cleavages : int, optional
+        Only species with at most this many inner sites are listed. The default is None.
+    min_length : int, optional
+        Only species longer than this are listed. The default is 0.
+    min_abundance : float, optional
+        Only species whose abundance exceeds this at some time point are listed. The
+        default is None, which lists every species.
+    block_size : int, optional
+        The number of species evaluated at once. The default is None, which bounds a
+        block to about 10^6 matrix entries.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The start and end of every species, sorted by start and then end, and a
+        species x times array of their abundances per initial molecule.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    positions = np.concatenate(([0], sites, [sequence_length]))
+    rates = np.concatenate(([0.0], rates, [0.0]))
+    n_boundaries = len(positions)
+    if block_size is None:
+        block_size = max(1, 10**6 // max(1, len(times)))
+
+    cut = 1 - np.exp(-np.outer(rates, times))
+    cut[[0, -1]] = 1
+    # prefix[j] - prefix[i + 1] is the total rate of the sites between boundaries i and j
+    prefix = np.concatenate(([0.0], np.cumsum(rates)))
+
+    max_span = n_boundaries - 1
+    if max_missed_cleavages is not None:
+        max_span = min(max_missed_cleavages + 1, max_span)
+
+    kept_lefts, kept_rights, kept_abundances = [], [], []
+    alive = np.arange(n_boundaries - 1)
+    for span in range(1, max_span + 1):
+        alive = alive[alive + span < n_boundaries]
+        still_alive = []
+        for offset in range(0, len(alive), block_size):
+            lefts = alive[offset:offset + block_size]
+            rights = lefts + span
+            inner = prefix[rights] - prefix[lefts + 1]
+            head = cut[lefts] * np.exp(-np.outer(inner, times))
+            abundances = head * cut[rights]
+            keep = positions[rights] - positions[lefts] > min_length
+            if min_abundance is not None:
+                keep &= abundances.max(axis=1, initial=0) > min_abundance
+                still_alive.append(lefts[head.max(axis=1, initial=0) > min_abundance])
+            else:
+                still_alive.append(lefts)
+            kept_lefts.append(lefts[keep])
+            kept_rights.append(rights[keep])
+            kept_abundances.append(abundances[keep])
+        alive = np.concatenate(still_alive) if still_alive else alive[:0]
+        if not len(alive):
+            break
+
+    if not kept_lefts:
+        return positions[:0], positions[:0], np.zeros((0, len(times)))
+    lefts, rights = np.concatenate(kept_lefts), np.concatenate(kept_rights)
+    order = np.lexsort((rights, lefts))
+    abundances = np.concatenate(kept_abundances)
+    # free the blocks before the sorted copy, so the peak is twice the output
+    del kept_abundances
+    abundances = abundances[order]
+    return positions[lefts[order]], positions[rights[order]], abundances
+
+
+def simulate_kinetic_digestion(sequence, proteases, rates, times, max_missed_cleavages=None,
+                               min_length=0, min_abundance=0.0, block_size=None,
+                               site_masks=None):
+    """
+    Simulates the time course of the digestion of a sequence, see kinetic_abundances.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to digest.
+    proteases : list of Protease
+        The proteases to digest the sequence with.
+    rates : float or list
+        The cleavage rate constants, see site_rates.
+    times : array-like of float
+        The time points, in the inverse unit of the rates.
+    max_missed_cleavages : int, optional
+        Only species with at most this many inner sites are listed. The default is None.
+    min_length : int, optional
+        Species must be longer than this. The default is 0.
+    min_abundance : float, optional
+        Species whose abundance never exceeds this are left out. The default is 0.0, which
+        leaves out the species that never form.
+    block_size : int, optional
+        The number of species evaluated at once, see kinetic_abundances. The default is None.
+    site_masks : list of numpy.ndarray, optional
+        Precomputed site masks of each protease. The default is None.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The Peptide, Start and End of every species, followed by one column per time
+        point with its abundance per initial molecule. The intact sequence is included.
+    """
+    if site_masks is None:
+        site_masks = find_site_masks(sequence, proteases)
+    sites, rates = site_rates(site_masks, rates)
+    starts, ends, abundances = kinetic_abundances(sites, rates, len(sequence), times,
+                                                  max_missed_cleavages=max_missed_cleavages,
+                                                  min_length=min_length,
+                                                  min_abundance=min_abundance,
+                                                  block_size=block_size)
+
+    # inserting the columns keeps the abundances in place instead of copying them
+    df = pd.DataFrame(abundances, columns=list(np.asarray(times, dtype=np.float64)))
+    df.insert(0, 'End', ends)
+    df.insert(0, 'Start', starts)
+    peptides = [sequence[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+    df.insert(0, 'Peptide', peptides)
+    return df
@@ -0,0 +1,196 @@
+import numpy as np
+
+from .Protease import encode_sequence
+
+
+MONOISOTOPIC_RESIDUE_MASSES = {
+    'G': 57.021464, 'A': 71.037114, 'S': 87.032028, 'P': 97.052764, 'V': 99.068414,
+    'T': 101.047679, 'C': 103.009185, 'L': 113.084064, 'I': 113.084064, 'N': 114.042927,
+    'D': 115.026943, 'Q': 128.058578, 'K': 128.094963, 'E': 129.042593, 'M': 131.040485,
+    'H': 137.058912, 'F': 147.068414, 'R': 156.101111, 'Y': 163.063329, 'W': 186.079313,
+    'U': 150.953636, 'O': 237.147727,
+}
+
+AVERAGE_RESIDUE_MASSES = {
+    'G': 57.0513, 'A': 71.0779, 'S': 87.0773, 'P': 97.1152, 'V': 99.1311,
+    'T': 101.1039, 'C': 103.1429, 'L': 113.1576, 'I': 113.1576, 'N': 114.1026,
+    'D': 115.0874, 'Q': 128.1292, 'K': 128.1723, 'E': 129.1140, 'M': 131.1961,
+    'H': 137.1393, 'F': 147.1739, 'R': 156.1857, 'Y': 163.1733, 'W': 186.2099,
+    'U': 150.0379, 'O': 237.2982,
+}
+
+WATER_MASSES = {'monoisotopic': 18.010565, 'average': 18.01528}
+
+PROTON_MASS = 1.007276
+
+
+def mass_table(masses):
+    """
+    Builds a lookup table from byte codes to residue masses.
+
+    Parameters
+    ----------
+    masses : dict of str to float
+        The mass of every residue.
+
+    Returns
+    -------
+    numpy.ndarray
+        A float64 array of length 256, NaN for residues without a mass.
+    """
+    table = np.full(256, np.nan)
+    for residue, mass in masses.items():
+        table[ord(residue)] = mass
+    return table
+
+
+_MASS_TABLES = {
+    'monoisotopic': mass_table(MONOISOTOPIC_RESIDUE_MASSES),
+    'average': mass_table(AVERAGE_RESIDUE_MASSES),
+}
+
+
+def _mass_table(kind):
+    if kind not in _MASS_TABLES:
+        raise ValueError("Invalid kind value. Use 'monoisotopic' or 'average'.")
+    return _MASS_TABLES[kind]
+
+
+def prefix_masses(sequence, kind='monoisotopic'):
+    """
+    Computes the cumulative residue masses of a sequence.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence.
+    kind : str, optional
+        'monoisotopic' or 'average'. The default is 'monoisotopic'.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Two arrays of length len(sequence) + 1 whose entry i is the mass of the first i
+        residues and the number of residues among them without a mass, such as X.
+        The residues of [start, end) weigh prefix[end] - prefix[start].
+    """
+    residue_masses = _mass_table(kind)[encode_sequence(sequence)]
+    unknown = np.isnan(residue_masses)
+    prefix = np.zeros(len(sequence) + 1)
+    np.cumsum(np.where(unknown, 0.0, residue_masses), out=prefix[1:])
+    unknowns = np.zeros(len(sequence) + 1, dtype=np.int64)
+    np.cumsum(unknown, out=unknowns[1:])
+    return prefix, unknowns
+
+
+def peptide_masses(sequence, starts, ends, kind='monoisotopic', prefix=None):
+    """
+    Computes the neutral masses of the peptides [start, end) of a sequence.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence the peptides are cut from.
+    starts : array-like of int
+        The start positions of the peptides.
+    ends : array-like of int
+        The end positions of the peptides.
+    kind : str, optional
+        'monoisotopic' or 'average'. The default is 'monoisotopic'.
+    prefix : tuple of numpy.ndarray, optional
+        The prefix_masses of the sequence, if already computed. The default is None.
+
+    Returns
+    -------
+    numpy.ndarray
+        The mass of every peptide, the sum of its residues plus one water, or NaN if it
+        contains a residue without a mass.
+    """
+    if prefix is None:
+        prefix = prefix_masses(sequence, kind)
+    masses, unknowns = prefix
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    known = unknowns[ends] == unknowns[starts]
+    return np.where(known, masses[ends] - masses[starts] + WATER_MASSES[kind], np.nan)
+
+
+def peptide_mass(peptide, kind='monoisotopic'):
+    """
+    Computes the neutral mass of a single peptide.
+
+    Parameters
+    ----------
+    peptide : str
+        The peptide.
+    kind : str, optional
+        'monoisotopic' or 'average'. The default is 'monoisotopic'.
+
+    Returns
+    -------
+    float
+        The sum of the residue masses plus one water.
+    """
+    return float(_mass_table(kind)[encode_sequence(peptide)].sum() + WATER_MASSES[kind])
+
+
+def sequence_masses(peptides, kind='monoisotopic'):
+    """
+    Computes the neutral masses of a list of peptides in one pass.
+
+    The peptides are concatenated, so their masses are differences of one prefix sum.
+
+    Parameters
+    ----------
+    peptides : list of str
+        The peptides.
+    kind : str, optional
+        'monoisotopic' or 'average'. The default is 'monoisotopic'.
+
+    Returns
+    -------
+    numpy.ndarray
+        The mass of every peptide.
+    """
+    lengths = np.fromiter((len(peptide) for peptide in peptides), dtype=np.int64,
+                          count=len(peptides))
+    ends = np.cumsum(lengths)
+    return peptide_masses(''.join(peptides), ends - lengths, ends, kind)
+
+
+def neutral_masses(mz, charge):
+    """
+    Converts m/z values of protonated ions to neutral masses.
+
+    Parameters
+    ----------
+    mz : array-like of float
+        The m/z values.
+    charge : int or array-like of int
+        The charge of the ions.
+
+    Returns
+    -------
+    numpy.ndarray
+        The neutral masses.
+    """
+    return (np.asarray(mz, dtype=np.float64) - PROTON_MASS) * charge
+
+
+def mz_values(masses, charge):
+    """
+    Converts neutral masses to the m/z values of their protonated ions.
+
+    Parameters
+    ----------
+    masses : array-like of float
+        The neutral masses.
+    charge : int or array-like of int
+        The charge of the ions.
+
+    Returns
+    -------
+    numpy.ndarray
+        The m/z values.
+    """
+    return np.asarray(masses, dtype=np.float64) / charge + PROTON_MASS
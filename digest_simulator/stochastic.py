@@ -0,0 +1,223 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from .intervals import find_site_masks
+
+
+def site_probabilities(site_masks, efficiencies):
+    """
+    Combines the cleavage efficiencies of several proteases into one probability per site.
+
+    A site is cut unless every protease that recognizes it misses it, so its probability
+    is 1 - prod(1 - e) over those proteases.
+
+    Parameters
+    ----------
+    site_masks : list of numpy.ndarray
+        The boolean site mask of each protease, see Protease.site_mask.
+    efficiencies : float or list
+        The probability that a protease cuts one of its sites. Either one float for all
+        proteases, or one entry per protease that is a float or an array with the
+        probability of every position of its site mask.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The sorted sites, as positions in the sequence, and their cut probabilities.
+    """
+    if np.isscalar(efficiencies):
+        efficiencies = [efficiencies] * len(site_masks)
+    if len(efficiencies) != len(site_masks):
+        raise ValueError("Give one efficiency per protease.")
+    if not len(site_masks):
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    miss = np.ones(len(site_masks[0]))
+    for mask, efficiency in zip(site_masks, efficiencies):
+        efficiency = np.broadcast_to(np.asarray(efficiency, dtype=np.float64), mask.shape)
+        if np.any((efficiency < 0) | (efficiency > 1)):
+            raise ValueError("Efficiencies must be between 0 and 1.")
+        miss *= np.where(mask, 1 - efficiency, 1)
+    union = np.logical_or.reduce(site_masks)
+    sites = np.flatnonzero(union)
+    return sites + 1, 1 - miss[sites]
+
+
+def count_peptides(cuts, positions):
+    """
+    Counts the peptides of a batch of digested molecules.
+
+    Parameters
+    ----------
+    cuts : numpy.ndarray
+        A replicates x boundaries boolean matrix, True where a molecule is cut. The first
+        and last columns are the termini and must be True.
+    positions : numpy.ndarray
+        The position in the sequence of every column.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The unique start and end positions and the number of molecules producing each.
+    """
+    # nonzero walks the matrix row by row, so consecutive cuts of a row are neighbours
+    rows, columns = np.nonzero(cuts)
+    same_row = rows[:-1] == rows[1:]
+    starts = positions[columns[:-1][same_row]]
+    ends = positions[columns[1:][same_row]]
+    n = positions[-1]
+    keys, counts = np.unique(starts * (n + 1) + ends, return_counts=True)
+    return keys // (n + 1), keys % (n + 1), counts
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """
+    Computes Wilson score intervals of binomial proportions.
+
+    Parameters
+    ----------
+    successes : numpy.ndarray
+        The number of successes.
+    trials : int
+        The number of trials.
+    confidence : float, optional
+        The confidence level. The default is 0.95.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The lower and upper bounds.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = np.asarray(successes, dtype=np.float64) / trials
+    center = (p + z**2 / (2 * trials)) / (1 + z**2 / trials)
+    spread = np.sqrt(p * (1 - p) / trials + z**2 / (4 * trials**2))
+    half_width = z / (1 + z**2 / trials) * spread
+    return np.clip(center - half_width, 0, 1), np.clip(center + half_width, 0, 1)
+
+
+def simulate_stochastic_digestion(sequence, proteases, efficiencies, replicates=1000,
+                                  min_length=0, confidence=0.95, seed=None, batch_size=None,
+                                  site_masks=None):
+    """
+    Simulates the digestion of many molecules of a sequence in which every site is cut
+    with a probability.
+
+    The sites are sampled independently for a batch of molecules at once as a
+    replicates x sites boolean matrix, and the peptides of all molecules of a batch are
+    counted with one pass over its nonzero entries.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to digest.
+    proteases : list of Protease
+        The proteases to digest the sequence with.
+    efficiencies : float or list
+        The cleavage efficiencies, see site_probabilities.
+    replicates : int, optional
+        The number of molecules to simulate. The default is 1000.
+    min_length : int, optional
+        Peptides must be longer than this. The default is 0.
+    confidence : float, optional
+        The confidence level of the abundance intervals. The default is 0.95.
+    seed : int or numpy.random.Generator, optional
+        The seed of the random numbers. The default is None.
+    batch_size : int, optional
+        The number of molecules sampled at once. The default is None, which bounds a batch
+        to about 10^7 matrix entries.
+    site_masks : list of numpy.ndarray, optional
+        Precomputed site masks of each protease. The default is None.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The Peptide, Start and End of every peptide that occurred, the Count of molecules
+        that produced it, its Abundance, the expected number of copies per molecule, and
+        the CI_Lower and CI_Upper bounds of the abundance. The intact sequence is listed
+        when some molecules were not cut at all.
+    """
+    if replicates < 1:
+        raise ValueError("replicates must be at least 1.")
+    if site_masks is None:
+        site_masks = find_site_masks(sequence, proteases)
+    sites, probabilities = site_probabilities(site_masks, efficiencies)
+    n = len(sequence)
+    positions = np.concatenate(([0], sites, [n]))
+    rng = np.random.default_rng(seed)
+    if batch_size is None:
+        batch_size = max(1, 10**7 // len(positions))
+
+    keys, counts = [], []
+    for offset in range(0, replicates, batch_size):
+        size = min(batch_size, replicates - offset)
+        cuts = np.ones((size, len(positions)), dtype=bool)
+        cuts[:, 1:-1] = rng.random((size, len(sites))) < probabilities
+        starts, ends, batch_counts = count_peptides(cuts, positions)
+        keys.append(starts * (n + 1) + ends)
+        counts.append(batch_counts)
+
+    keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    counts = np.bincount(inverse.ravel(), weights=np.concatenate(counts)).astype(np.int64)
+    starts, ends = keys // (n + 1), keys % (n + 1)
+    keep = ends - starts > min_length
+    starts, ends, counts = starts[keep], ends[keep], counts[keep]
+
+    lower, upper = wilson_interval(counts, replicates, confidence)
+    return pd.DataFrame({
+        'Peptide': [sequence[start:end] for start, end in zip(starts.tolist(), ends.tolist())],
+        'Start': starts,
+        'End': ends,
+        'Count': counts,
+        'Abundance': counts / replicates,
+        'CI_Lower': lower,
+        'CI_Upper': upper,
+    })
+
+
+def expected_abundances(sequence, starts, ends, proteases, efficiencies, site_masks=None):
+    """
+    Computes the exact expected abundances of peptides under independent site cleavage.
+
+    A peptide occurs when both of its ends are cut and none of the sites inside it is.
+
+    Parameters
+    ----------
+    sequence : str
+        The digested sequence.
+    starts : array-like of int
+        The start positions of the peptides.
+    ends : array-like of int
+        The end positions of the peptides.
+    proteases : list of Protease
+        The proteases the sequence was digested with.
+    efficiencies : float or list
+        The cleavage efficiencies, see site_probabilities.
+    site_masks : list of numpy.ndarray, optional
+        Precomputed site masks of each protease. The default is None.
+
+    Returns
+    -------
+    numpy.ndarray
+        The expected number of copies of every peptide per molecule.
+    """
+    if site_masks is None:
+        site_masks = find_site_masks(sequence, proteases)
+    sites, probabilities = site_probabilities(site_masks, efficiencies)
+    n = len(sequence)
+    cut = np.zeros(n + 1)
+    cut[[0, n]] = 1
+    cut[sites] = probabilities
+    # log-prefix sums of the miss probabilities turn the product over the inner sites
+    # into a subtraction; sites that are always cut are counted separately
+    always = cut >= 1
+    log_miss = np.log(np.where(always, 1, 1 - cut))
+    prefix_log = np.concatenate(([0], np.cumsum(log_miss)))
+    prefix_always = np.concatenate(([0], np.cumsum(always)))
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    inner_log = prefix_log[ends] - prefix_log[starts + 1]
+    inner_always = prefix_always[ends] - prefix_always[starts + 1]
+    return np.where(inner_always > 0, 0, cut[starts] * cut[ends] * np.exp(inner_log))
@@ -1,13 +1,20 @@
 import csv
 import re
 
-from collections import Counter
-from itertools import combinations
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from itertools import chain, combinations, islice
 
+import numpy as np
+
+from .AhoCorasick import AhoCorasick
 from .PeptideNode import PeptideNode
+from .Protease import encode_sequence
+from .mass import sequence_masses
 
 
-def generate_peptide_tree(node, proteases, depth=0, max_depth=None, min_length=0, peptides_added=None):
+def generate_peptide_tree(node, proteases, depth=0, max_depth=None, min_length=0,
+                          peptides_added=None, site_lists=None):
     """
     Generates a peptide tree for the given node and proteases.
 
@@ -23,26 +30,35 @@ def generate_peptide_tree(node, proteases, depth=0, max_depth=None, min_length=0
         The maximum depth of the peptide tree. The default is None.
     min_length : int, optional
         The minimum length of the peptides in the peptide tree. The default is 0.
+    peptides_added : set of str, optional
+        The peptides already in the tree, shared across the recursion so that every
+        peptide is added only once. The default is None.
+    site_lists : list of list of int, optional
+        The cleavage sites of every protease in the sequence of the root, shared across
+        the recursion. The default is None, which finds them in node if it has a start.
     """
 
     if peptides_added is None:
-        peptides_added = []
+        peptides_added = set()
+    if site_lists is None:
+        site_lists = _site_lists(node, proteases)
 
     if depth >= max_depth:
         return
 
-    for protease in proteases:
-        cleaved_peptides = protease.cleave(node.peptide)
-        for peptide in cleaved_peptides:
-            # create a child node only when the peptide is different from the parent peptide
-            if (peptide != node.peptide) and (len(peptide) > min_length) and (peptide not in peptides_added):
-                    child_node = PeptideNode(peptide, parent=node)
-                    node.add_child(child_node)
-                    peptides_added.append(peptide)
-                    generate_peptide_tree(child_node, proteases, depth + 1, max_depth, min_length=min_length, peptides_added=peptides_added)
+    for peptide, start in _cleaved_peptides(node, proteases, site_lists):
+        # create a child node only when the peptide is different from the parent peptide
+        if ((peptide != node.peptide) and (len(peptide) > min_length)
+                and (peptide not in peptides_added)):
+                child_node = PeptideNode(peptide, parent=node, start=start)
+                node.add_child(child_node)
+                peptides_added.add(peptide)
+                generate_peptide_tree(child_node, proteases, depth + 1, max_depth,
+                                      min_length=min_length, peptides_added=peptides_added,
+                                      site_lists=site_lists)
                     
 
-def find_peptide_positions(sequence, peptide):
+def find_peptide_positions(sequence, peptide, index=None):
     """
     Finds the positions of the given peptide in the given sequence.
 
@@ -52,8 +68,13 @@ def find_peptide_positions(sequence, peptide):
         The sequence to search for the peptide.
     peptide : str
         The peptide to search for in the sequence.  
+    index : SuffixArray, optional
+        A suffix array built for the sequence. When given, the positions are looked up
+        in the index instead of scanning the sequence. The default is None.
     """
-    
+    if index is not None:
+        return index.find(peptide).tolist()
+
     positions = []
     index = 0
     while index < len(sequence):
@@ -65,6 +86,37 @@ def find_peptide_positions(sequence, peptide):
     return positions
     
 
+def find_peptides_in_proteins(peptides, proteins):
+    """
+    Finds all occurrences of many peptides in many proteins at once.
+
+    The peptides are compiled into an Aho-Corasick automaton and every protein is
+    scanned once, so the cost is linear in the total protein length plus the number
+    of hits, independent of the number of peptides.
+
+    Parameters
+    ----------
+    peptides : iterable of str
+        The peptides to search for.
+    proteins : dict or iterable of tuple of str
+        The proteins to search, either a dict mapping names to sequences or
+        (name, sequence) records such as those of read_fasta.
+
+    Returns
+    -------
+    list of tuple
+        The (peptide, protein, offset) of every occurrence, including overlapping ones.
+    """
+    automaton = AhoCorasick(peptides)
+    if isinstance(proteins, dict):
+        proteins = proteins.items()
+    hits = []
+    for protein, sequence in proteins:
+        for peptide, offset in automaton.iter_matches(sequence):
+            hits.append((peptide, protein, offset))
+    return hits
+    
+
 def print_aligned_peptide(peptide, position, sequence):
     """
     Prints the given peptide aligned to the given position in the given sequence.
@@ -157,6 +209,355 @@ def extract_peptide_sequences(node, root=True):
     return peptide_sequences
 
 
+def _site_lists(node, proteases):
+    """
+    Finds the sorted cleavage sites of every protease in the peptide of a node with a start,
+    as positions in the sequence. Returns None for a node without a start.
+    """
+    if node.start is None:
+        return None
+    codes = encode_sequence(node.peptide)
+    return [(np.flatnonzero(protease.site_mask(codes)) + 1 + node.start).tolist()
+            for protease in proteases]
+
+
+def cut_at_sites(peptide, start, sites):
+    """
+    Cuts a peptide at the given sorted sites of the sequence it starts in.
+
+    Parameters
+    ----------
+    peptide : str
+        The peptide.
+    start : int
+        The position of the peptide in the sequence.
+    sites : list of int
+        The sorted cleavage sites of one protease in the sequence.
+
+    Returns
+    -------
+    list of tuple
+        The pieces and their positions in the sequence.
+    """
+    end = start + len(peptide)
+    bounds = [start] + sites[bisect_right(sites, start):bisect_left(sites, end)] + [end]
+    return [(peptide[a - start:b - start], a) for a, b in zip(bounds, bounds[1:])]
+
+
+def _cleaved_peptides(node, proteases, site_lists=None):
+    # the sites of the full sequence are used when known, so proteases whose sites depend
+    # on residues beyond the peptide (see PSSMProtease) cut the same bonds at every depth
+    if site_lists is not None and node.start is not None:
+        for sites in site_lists:
+            yield from cut_at_sites(node.peptide, node.start, sites)
+        return
+    for protease in proteases:
+        offset = 0
+        for peptide in protease.cleave(node.peptide):
+            yield peptide, None if node.start is None else node.start + offset
+            offset += len(peptide)
+
+
+def generate_peptide_tree_iterative(root, proteases, max_depth=None, min_length=0,
+                                    peptides_added=None, order='depth_first'):
+    """
+    Generates a peptide tree for the given root without recursion.
+
+    Parameters
+    ----------
+    root : PeptideNode
+        The root node to generate the peptide tree for.
+    proteases : list of Protease
+        The list of proteases to use for generating the peptide tree.
+    max_depth : int, optional
+        The maximum depth of the peptide tree. The default is None, which means no limit.
+    min_length : int, optional
+        The minimum length of the peptides in the peptide tree. The default is 0.
+    peptides_added : set of str, optional
+        The peptides already in the tree. The default is None.
+    order : str, optional
+        'depth_first' adds the nodes in the same order as generate_peptide_tree, using an
+        explicit stack. 'breadth_first' uses a queue and adds the nodes level by level.
+        The default is 'depth_first'.
+    """
+    if peptides_added is None:
+        peptides_added = set()
+    site_lists = _site_lists(root, proteases)
+
+    def expandable(depth):
+        return max_depth is None or depth < max_depth
+
+    def accept(peptide, parent):
+        return ((peptide != parent.peptide) and (len(peptide) > min_length)
+                and (peptide not in peptides_added))
+
+    if order == 'depth_first':
+        if not expandable(0):
+            return
+        stack = [(root, 0, _cleaved_peptides(root, proteases, site_lists))]
+        while stack:
+            node, depth, peptides = stack[-1]
+            for peptide, start in peptides:
+                if accept(peptide, node):
+                    child_node = PeptideNode(peptide, parent=node, start=start)
+                    node.add_child(child_node)
+                    peptides_added.add(peptide)
+                    if expandable(depth + 1):
+                        stack.append((child_node, depth + 1,
+                                      _cleaved_peptides(child_node, proteases, site_lists)))
+                    break
+            else:
+                stack.pop()
+    elif order == 'breadth_first':
+        queue = deque([(root, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            if not expandable(depth):
+                continue
+            for peptide, start in _cleaved_peptides(node, proteases, site_lists):
+                if accept(peptide, node):
+                    child_node = PeptideNode(peptide, parent=node, start=start)
+                    node.add_child(child_node)
+                    peptides_added.add(peptide)
+                    queue.append((child_node, depth + 1))
+    else:
+        raise ValueError("Invalid order value. Use 'depth_first' or 'breadth_first'.")
+
+
+def _child_positions(node, sequence, start_index):
+    for child in node.children:
+        for match in re.finditer(re.escape(child.peptide), sequence[start_index:]):
+            yield child, match.start() + start_index + 1
+
+
+def draw_tree_iterative(root, sequence, min_length, order='depth_first'):
+    """
+    Draws the given peptide tree without recursion.
+
+    Parameters
+    ----------
+    root : PeptideNode
+        The root node of the peptide tree.
+    sequence : str
+        The sequence to align the peptides to.
+    min_length : int
+        The minimum length of the peptides in the peptide tree.
+    order : str, optional
+        'depth_first' draws the lines in the same order as draw_tree, using an explicit
+        stack. 'breadth_first' uses a queue and draws the tree level by level.
+        The default is 'depth_first'.
+
+    Returns
+    -------
+    str
+        The sequence followed by one aligned line per peptide.
+    """
+    printed_peptides = set()
+    lines = [sequence]
+
+    def visit(node, start_index):
+        peptide_position = (node.peptide, node.parent.peptide)
+        if peptide_position not in printed_peptides:
+            lines.append(print_aligned_peptide(node.peptide, start_index, sequence))
+            printed_peptides.add(peptide_position)
+
+    if order == 'depth_first':
+        stack = [_child_positions(root, sequence, 0)]
+        while stack:
+            for child, start_index in stack[-1]:
+                visit(child, start_index)
+                stack.append(_child_positions(child, sequence, start_index))
+                break
+            else:
+                stack.pop()
+    elif order == 'breadth_first':
+        queue = deque([(root, 0)])
+        while queue:
+            node, start_index = queue.popleft()
+            for child, child_start_index in _child_positions(node, sequence, start_index):
+                visit(child, child_start_index)
+                queue.append((child, child_start_index))
+    else:
+        raise ValueError("Invalid order value. Use 'depth_first' or 'breadth_first'.")
+
+    return '\n'.join(lines) + '\n'
+
+
+def iter_tree_positions(root, sequence, order='depth_first'):
+    """
+    Yields the position of every peptide of the given tree, visiting each node once.
+
+    The positions are the start attributes set by generate_peptide_tree. For nodes without
+    one, the peptide is searched within the span of its parent only.
+
+    Parameters
+    ----------
+    root : PeptideNode
+        The root node of the peptide tree.
+    sequence : str
+        The sequence the peptides are aligned to.
+    order : str, optional
+        'depth_first' yields the nodes in the order of draw_tree, 'breadth_first' level by
+        level. The default is 'depth_first'.
+
+    Yields
+    ------
+    tuple of int and str
+        The start position and the peptide of every node except the root.
+    """
+    def locate(node, parent_start, parent_length):
+        if node.start is not None:
+            return node.start
+        start = sequence.find(node.peptide, parent_start, parent_start + parent_length)
+        return parent_start if start == -1 else start
+
+    root_start = locate(root, 0, len(sequence))
+    if order == 'depth_first':
+        stack = [(root, root_start)]
+        pop = stack.pop
+    elif order == 'breadth_first':
+        stack = deque([(root, root_start)])
+        pop = stack.popleft
+    else:
+        raise ValueError("Invalid order value. Use 'depth_first' or 'breadth_first'.")
+
+    while stack:
+        node, start = pop()
+        if node is not root:
+            yield start, node.peptide
+        children = [(child, locate(child, start, len(node.peptide)))
+                    for child in node.children]
+        stack.extend(reversed(children) if order == 'depth_first' else children)
+
+
+def format_aligned_peptide(peptide, start, sequence_length):
+    """
+    Pads the given peptide with spaces so that it lines up with the sequence.
+
+    Parameters
+    ----------
+    peptide : str
+        The peptide to align.
+    start : int
+        The position of the peptide in the sequence.
+    sequence_length : int
+        The length of the sequence.
+
+    Returns
+    -------
+    str
+        The aligned peptide, as long as the sequence.
+    """
+    return ' ' * start + peptide + ' ' * (sequence_length - start - len(peptide))
+
+
+def iter_tree_lines(root, sequence, order='depth_first', start_line=0, max_lines=None):
+    """
+    Yields the lines of the given peptide tree lazily.
+
+    The first line is the sequence, followed by one aligned line per node. Only the lines
+    that are yielded are formatted, and besides the traversal stack no state grows with
+    the size of the tree.
+
+    Parameters
+    ----------
+    root : PeptideNode
+        The root node of the peptide tree.
+    sequence : str
+        The sequence to align the peptides to.
+    order : str, optional
+        'depth_first' or 'breadth_first'. The default is 'depth_first'.
+    start_line : int, optional
+        The number of lines to skip, for paginating. The default is 0.
+    max_lines : int, optional
+        The maximum number of lines to yield. The default is None, which yields all lines.
+
+    Yields
+    ------
+    str
+        The next line, without a line break.
+    """
+    positions = chain([(0, sequence)], iter_tree_positions(root, sequence, order=order))
+    stop = None if max_lines is None else start_line + max_lines
+    for start, peptide in islice(positions, start_line, stop):
+        yield format_aligned_peptide(peptide, start, len(sequence))
+
+
+def write_lines(lines, stream):
+    """
+    Writes lines to a text stream one at a time, so they never need to fit in memory.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        The lines, without line breaks.
+    stream : file-like
+        The text stream to write to, for example sys.stdout or an open file.
+
+    Returns
+    -------
+    int
+        The number of lines written.
+    """
+    n_lines = 0
+    for line in lines:
+        stream.write(line + '\n')
+        n_lines += 1
+    return n_lines
+
+
+def write_tree(root, sequence, stream, order='depth_first', start_line=0, max_lines=None):
+    """
+    Writes the lines of the given peptide tree to a text stream as they are generated.
+
+    Parameters
+    ----------
+    root : PeptideNode
+        The root node of the peptide tree.
+    sequence : str
+        The sequence to align the peptides to.
+    stream : file-like
+        The text stream to write to, for example sys.stdout or an open file.
+    order : str, optional
+        'depth_first' or 'breadth_first'. The default is 'depth_first'.
+    start_line : int, optional
+        The number of lines to skip. The default is 0.
+    max_lines : int, optional
+        The maximum number of lines to write. The default is None.
+
+    Returns
+    -------
+    int
+        The number of lines written.
+    """
+    lines = iter_tree_lines(root, sequence, order=order, start_line=start_line,
+                            max_lines=max_lines)
+    return write_lines(lines, stream)
+
+
+def extract_peptide_sequences_iterative(root):
+    """
+    Extracts the peptide sequences from the given peptide tree without recursion.
+
+    Parameters
+    ----------
+    root : PeptideNode
+        The root node of the peptide tree.
+
+    Returns
+    -------
+    set of str
+        The peptide sequences of all nodes except the root.
+    """
+    peptide_sequences = set()
+    stack = list(root.children)
+    while stack:
+        node = stack.pop()
+        peptide_sequences.add(node.peptide)
+        stack.extend(node.children)
+    return peptide_sequences
+
+
 def calculate_possible_cleavage_sites(protease, sequence):
     """
     Calculates the possible number of cleavage sites in the given sequence for the given protease.
@@ -168,11 +569,7 @@ def calculate_possible_cleavage_sites(protease, sequence):
     Returns:
     int: The number of possible cleavage sites in the sequence.
     """
-    possible_sites = 0
-    for i in range(len(sequence) - 1):
-        if sequence[i] in protease.cleavage_residues and sequence[i + 1] not in protease.no_cleavage_after:
-            possible_sites += 1
-    return possible_sites
+    return int(protease.site_mask(encode_sequence(sequence)).sum())
 
 
 def analyze_cleavage_sites(peptide_sequences):
@@ -215,6 +612,9 @@ def write_proteins_to_mascot_csv_file(protein_sequences, acc='alpha', file_name=
     """
     Writes the given protein sequences to a csv file in the format of Mascot csv file.
 
+    pep_calc_mr is the monoisotopic mass of each sequence, or -1 if it contains a residue
+    without a mass.
+
     Parameters
     ----------
     protein_sequences : list of str
@@ -237,7 +637,6 @@ def write_proteins_to_mascot_csv_file(protein_sequences, acc='alpha', file_name=
     pep_exp_mz = -1
     pep_exp_mr = -1
     pep_exp_z = -1
-    pep_calc_mr = -1
     pep_delta = -1
     pep_miss = -1
     pep_score = -1
@@ -246,6 +645,10 @@ def write_proteins_to_mascot_csv_file(protein_sequences, acc='alpha', file_name=
     pep_res_before = "B"
     pep_res_after = "B"
 
+    protein_sequences = list(protein_sequences)
+    pep_calc_mrs = [-1 if np.isnan(mass) else round(mass, 6)
+                    for mass in sequence_masses(protein_sequences).tolist()]
+
     with open(file_name, 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow([])
@@ -253,7 +656,8 @@ def write_proteins_to_mascot_csv_file(protein_sequences, acc='alpha', file_name=
         writer.writerow([])        
         writer.writerow(header)
         
-        for i, sequence in enumerate(protein_sequences, start=1):
+        peptides = zip(protein_sequences, pep_calc_mrs)
+        for i, (sequence, pep_calc_mr) in enumerate(peptides, start=1):
             row = [i, acc, prot_mass, pep_query, pep_rank, pep_isbold, pep_isunique,
                    pep_exp_mz, pep_exp_mr, pep_exp_z, pep_calc_mr, pep_delta, pep_miss,
                    pep_score, pep_expect, pep_res_before, sequence, pep_res_after]
@@ -1,6 +1,6 @@
 from setuptools import setup, find_packages
 
-install_requires = ['pandas']
+install_requires = ['pandas', 'numpy']
 
 config = {
     'description': 'Predicts breakdown of protein sequences by proteases',
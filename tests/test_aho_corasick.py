@@ -0,0 +1,76 @@
+import random
+
+from digest_simulator.AhoCorasick import AhoCorasick
+from digest_simulator.tools import find_peptide_positions, find_peptides_in_proteins
+
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN
+
+
+def scan(peptides, proteins):
+    return sorted((peptide, protein, offset)
+                  for peptide in set(peptides) if peptide
+                  for protein, sequence in proteins.items()
+                  for offset in find_peptide_positions(sequence, peptide))
+
+
+def random_proteome(seed=0):
+    rng = random.Random(seed)
+    # a small alphabet gives many repeated and overlapping matches
+    proteome = {f'random{i}': ''.join(rng.choice('AGK') for _ in range(rng.randint(0, 40)))
+                for i in range(20)}
+    proteome.update({'hbb': HEMOGLOBIN_BETA, 'ubiquitin': UBIQUITIN, 'empty': ''})
+    return proteome
+
+
+def random_peptides(proteome, seed=1):
+    rng = random.Random(seed)
+    sequences = [sequence for sequence in proteome.values() if sequence]
+    peptides = []
+    for _ in range(60):
+        sequence = rng.choice(sequences)
+        start = rng.randint(0, len(sequence) - 1)
+        peptides.append(sequence[start:start + rng.randint(1, 8)])
+    repeated = ['', 'A', 'AA', 'AA', 'AAAA', 'GAG', 'GKGK', 'K', 'KK', 'VKAHGKK', 'W', 'X']
+    return peptides + repeated
+
+
+def test_matches_scan_on_proteome():
+    proteome = random_proteome()
+    peptides = random_peptides(proteome)
+    assert sorted(find_peptides_in_proteins(peptides, proteome)) == scan(peptides, proteome)
+    assert sorted(find_peptides_in_proteins(peptides, list(proteome.items()))) == \
+        scan(peptides, proteome)
+
+
+def test_iter_matches_per_sequence():
+    proteome = random_proteome(seed=2)
+    automaton = AhoCorasick(random_peptides(proteome, seed=3))
+    for sequence in proteome.values():
+        matches = list(automaton.iter_matches(sequence))
+        ends = [offset + len(peptide) for peptide, offset in matches]
+        assert ends == sorted(ends)
+        expected = [(peptide, offset) for peptide in automaton.patterns
+                    for offset in find_peptide_positions(sequence, peptide)]
+        assert sorted(matches) == sorted(expected)
+
+
+def test_overlapping_and_nested_patterns():
+    automaton = AhoCorasick(['AAAA', 'AA', 'AAAA'])
+    assert automaton.patterns == ['AA', 'AAAA']
+    matches = list(automaton.iter_matches('AAAAAAA'))
+    assert sorted(offset for peptide, offset in matches if peptide == 'AAAA') == [0, 1, 2, 3]
+    assert sorted(offset for peptide, offset in matches if peptide == 'AA') == list(range(6))
+
+    # the failure links must fall back from HEKK to KK and from SHE to HE
+    automaton = AhoCorasick(['HE', 'SHE', 'HEKK', 'KK', 'EKA'])
+    assert sorted(automaton.iter_matches('SHEKKA')) == \
+        [('HE', 1), ('HEKK', 1), ('KK', 3), ('SHE', 0)]
+
+
+def test_empty_inputs():
+    assert list(AhoCorasick([]).iter_matches(UBIQUITIN)) == []
+    assert list(AhoCorasick(['']).iter_matches(UBIQUITIN)) == []
+    assert list(AhoCorasick(['MQ']).iter_matches('')) == []
+    assert find_peptides_in_proteins([], {'ubiquitin': UBIQUITIN}) == []
+    assert find_peptides_in_proteins(['MQ'], {}) == []
+    assert find_peptides_in_proteins(['MQ'], []) == []
@@ -0,0 +1,70 @@
+import pytest
+
+from digest_simulator.DigestStore import DigestStore
+from digest_simulator.batch import digest_fasta, digest_records, main
+
+from .test_fasta import RECORDS, fasta_text, write
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN
+
+
+PROTEASES = ['Trypsin', 'Chymotrypsin']
+
+# repeated sequences give chunks in which some records are stored and others are not
+FASTA_RECORDS = RECORDS + [('hbb', HEMOGLOBIN_BETA), ('ubiquitin', UBIQUITIN),
+                           ('ubiquitin-copy', UBIQUITIN)]
+
+
+def read_output(file_name):
+    with open(file_name) as f:
+        header = f.readline()
+        return header, sorted(f)
+
+
+def expected_output(records=FASTA_RECORDS):
+    lines = [f'{accession}\t{peptide}\n'
+             for accession, peptides in digest_records(records, PROTEASES)
+             for peptide in peptides]
+    return 'accession\tpeptide\n', sorted(lines)
+
+
+def test_output_does_not_depend_on_store(tmp_path):
+    fasta = write(tmp_path / 'proteins.fasta', fasta_text(FASTA_RECORDS))
+    store_file = str(tmp_path / 'digests.db')
+    expected = expected_output()
+
+    without_store = str(tmp_path / 'without_store.tsv')
+    assert digest_fasta(fasta, PROTEASES, without_store, workers=2, chunk_size=2,
+                        max_pending=1) == len(FASTA_RECORDS)
+    assert read_output(without_store) == expected
+
+    for name in ('cold.tsv', 'warm.tsv'):
+        output_file = str(tmp_path / name)
+        assert digest_fasta(fasta, PROTEASES, output_file, workers=2, chunk_size=2,
+                            store_file=store_file) == len(FASTA_RECORDS)
+        assert read_output(output_file) == expected
+    with DigestStore(store_file) as store:
+        assert len(store) == len({sequence for _, sequence in FASTA_RECORDS})
+
+    # a partially stored file digests only the new records
+    records = FASTA_RECORDS + [('new', 'AAAKWWWRLLLF')]
+    partial = write(tmp_path / 'partial.fasta', fasta_text(records))
+    output_file = str(tmp_path / 'partial.tsv')
+    assert digest_fasta(partial, PROTEASES, output_file, workers=2, chunk_size=3,
+                        store_file=store_file) == len(records)
+    assert read_output(output_file) == expected_output(records)
+    with DigestStore(store_file) as store:
+        assert len(store) == len({sequence for _, sequence in FASTA_RECORDS}) + 1
+
+
+def test_main(tmp_path, capsys):
+    fasta = write(tmp_path / 'proteins.fasta', fasta_text(FASTA_RECORDS))
+    output_file = str(tmp_path / 'peptides.tsv')
+    main([fasta, '-p', *PROTEASES, '-o', output_file, '-j', '2', '-c', '2'])
+    assert read_output(output_file) == expected_output()
+    assert f'Digested {len(FASTA_RECORDS)} records' in capsys.readouterr().out
+
+
+def test_rejects_unknown_protease(tmp_path):
+    fasta = write(tmp_path / 'proteins.fasta', fasta_text(FASTA_RECORDS))
+    with pytest.raises(ValueError, match='Unknown proteases: Papain'):
+        digest_fasta(fasta, ['Trypsin', 'Papain'], str(tmp_path / 'peptides.tsv'))
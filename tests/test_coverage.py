@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from digest_simulator.coverage import (coverage_depth, coverage_image, coverage_matrix,
+                                       load_coverage, save_coverage)
+
+
+def random_intervals(sequence_length, count=200, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, sequence_length, count)
+    ends = np.minimum(starts + rng.integers(1, 40, count), sequence_length)
+    return starts, ends
+
+
+def test_short_sequences_are_scaled_up():
+    starts, ends = np.array([0, 2]), np.array([3, 5])
+    image = coverage_image(starts, ends, 5, width=20, max_row_height=3)
+    assert image.shape == (2 * 3, 5 * 4)
+    assert np.array_equal(image[::3, ::4], 255 - 255 * coverage_matrix(starts, ends, 5))
+
+
+@pytest.mark.parametrize('sequence_length', [1201, 3000, 100003])
+@pytest.mark.parametrize('width', [1, 7, 1200])
+def test_long_sequences_are_binned_to_width(sequence_length, width):
+    starts, ends = random_intervals(sequence_length)
+    image = coverage_image(starts, ends, sequence_length, width=width)
+    assert image.shape == (len(starts), width)
+    assert image.dtype == np.uint8
+
+    # a column is black when the peptide covers any of its residues
+    columns = np.arange(sequence_length) * width // sequence_length
+    expected = np.zeros((len(starts), width), dtype=bool)
+    for row, (start, end) in enumerate(zip(starts, ends)):
+        expected[row, columns[start:end]] = True
+    assert np.array_equal(image == 0, expected)
+
+
+def test_no_peptides():
+    empty = np.zeros(0, dtype=np.int64)
+    assert coverage_image(empty, empty, 5000).shape == (0, 1200)
+
+
+def test_depth_matches_matrix():
+    starts, ends = random_intervals(500)
+    assert np.array_equal(coverage_depth(starts, ends, 500),
+                          coverage_matrix(starts, ends, 500).sum(axis=0))
+
+
+def test_save_and_load(tmp_path):
+    starts, ends = random_intervals(500)
+    file_name = str(tmp_path / 'coverage.npz')
+    save_coverage(file_name, starts, ends, 500)
+    loaded_starts, loaded_ends, sequence_length = load_coverage(file_name)
+    assert np.array_equal(loaded_starts, starts)
+    assert np.array_equal(loaded_ends, ends)
+    assert sequence_length == 500
@@ -0,0 +1,110 @@
+from digest_simulator.DigestCache import (DigestCache, approximate_size, digest_cache,
+                                          digest_key)
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.ProteasePredictor import ProteasePredictor
+
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN, proteases
+from .test_protease_predictor import NAMES, observed_peptides
+
+
+def peptides(prefix, count=3):
+    return {f'{prefix}{i}' for i in range(count)}
+
+
+def test_least_recently_used_is_evicted():
+    cache = DigestCache(max_entries=2)
+    cache.put('a', peptides('A'))
+    cache.put('b', peptides('B'))
+    assert cache.get('a') == peptides('A')
+    cache.put('c', peptides('C'))
+    assert 'b' not in cache
+    assert 'a' in cache and 'c' in cache
+    assert cache.evictions == 1
+
+
+def test_evicts_to_max_bytes():
+    size = approximate_size(frozenset(peptides('A')))
+    cache = DigestCache(max_bytes=2 * size)
+    cache.put('a', peptides('A'))
+    cache.put('b', peptides('B'))
+    assert len(cache) == 2
+    assert cache.current_bytes == 2 * size
+    cache.put('c', peptides('C'))
+    assert list(cache._entries) == ['b', 'c']
+    assert cache.current_bytes == 2 * size
+
+    # replacing a digest does not count its old size twice
+    cache.put('c', peptides('D'))
+    assert cache.current_bytes == 2 * size
+    assert cache.get('c') == peptides('D')
+
+
+def test_digest_larger_than_max_bytes_is_not_stored():
+    cache = DigestCache(max_bytes=approximate_size(frozenset(peptides('A'))) - 1)
+    stored = cache.put('a', peptides('A'))
+    assert stored == peptides('A')
+    assert 'a' not in cache
+    assert cache.current_bytes == 0
+    assert cache.evictions == 0
+
+
+def test_resize():
+    cache = DigestCache()
+    for key in 'abcd':
+        cache.put(key, peptides(key))
+    cache.resize(max_entries=2)
+    assert list(cache._entries) == ['c', 'd']
+    assert cache.evictions == 2
+    cache.resize(max_bytes=0)
+    assert len(cache) == 0
+    assert cache.current_bytes == 0
+    assert cache.max_entries == 2
+
+
+def test_stats():
+    cache = DigestCache(max_entries=1)
+    assert cache.get('a') is None
+    cache.put('a', peptides('A'))
+    cache.get('a')
+    cache.put('b', peptides('B'))
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 1, 'entries': 1,
+                             'bytes': approximate_size(frozenset(peptides('B')))}
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'evictions': 0, 'entries': 0,
+                             'bytes': 0}
+
+
+def test_simulator_cache_hit_builds_tree_lazily():
+    protease_list = proteases('Trypsin', 'AspN')
+    key = digest_key(UBIQUITIN, protease_list, 3, 100, 'tree')
+    digest_cache.clear()
+    try:
+        first = DigestionSimulator(UBIQUITIN, protease_list)
+        expected = first.extract_unique_peptide_sequences()
+        assert key in digest_cache
+
+        cached = DigestionSimulator(UBIQUITIN, protease_list)
+        assert not cached._tree_generated
+        assert cached.extract_unique_peptide_sequences() == expected
+        assert not cached._tree_generated
+        assert digest_cache.hits == 1
+
+        # the tree is only built when it is needed
+        root = cached.root
+        assert cached._tree_generated
+        assert [child.peptide for child in root.children] == \
+            [child.peptide for child in first.root.children]
+    finally:
+        digest_cache.clear()
+
+
+def test_search_caches_only_scored_combinations():
+    peptides = observed_peptides(HEMOGLOBIN_BETA, ('Trypsin',))
+    predictor = ProteasePredictor(HEMOGLOBIN_BETA, proteases(*NAMES))
+    digest_cache.clear()
+    try:
+        predictor.search(peptides, top_k=3)
+        assert len(digest_cache) == predictor.search_statistics['visited']
+        assert digest_cache.misses == predictor.search_statistics['visited']
+    finally:
+        digest_cache.clear()
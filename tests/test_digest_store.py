@@ -0,0 +1,61 @@
+from digest_simulator.DigestCache import digest_key
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.DigestStore import MAX_VARIABLES, DigestStore
+
+from .test_intervals import HEMOGLOBIN_BETA, proteases
+
+
+def test_put_and_get(tmp_path):
+    with DigestStore(str(tmp_path / 'digests.db')) as store:
+        store.put('a', ['PEPTIDE', 'MQIFVK', 'PEPTIDE'])
+        store.put('empty', set())
+        assert store.get('a') == frozenset({'PEPTIDE', 'MQIFVK'})
+        assert store.get('empty') == frozenset()
+        assert store.get('missing') is None
+        assert 'a' in store and 'empty' in store
+        assert 'missing' not in store
+        assert len(store) == 2
+
+
+def test_get_many_across_batches(tmp_path):
+    count = 2 * MAX_VARIABLES + 5
+    with DigestStore(str(tmp_path / 'digests.db')) as store:
+        store.put_many((f'key{i}', {f'PEP{i}', f'TIDE{i}'}) for i in range(count))
+        keys = [f'key{i}' for i in range(count)] + ['missing']
+        found = store.get_many(keys)
+        assert len(found) == count
+        assert all(found[f'key{i}'] == {f'PEP{i}', f'TIDE{i}'} for i in range(count))
+        assert store.get_many([]) == {}
+
+
+def test_put_many_replaces_rows(tmp_path):
+    with DigestStore(str(tmp_path / 'digests.db')) as store:
+        store.put_many([('a', {'AAA'}), ('b', {'BBB'})])
+        store.put_many([('a', {'CCC', 'DDD'}), ('c', set())])
+        assert store.get_many(['a', 'b', 'c']) == {
+            'a': frozenset({'CCC', 'DDD'}), 'b': frozenset({'BBB'}), 'c': frozenset()}
+        assert len(store) == 3
+
+
+def test_reopen(tmp_path):
+    file_name = str(tmp_path / 'digests.db')
+    with DigestStore(file_name) as store:
+        store.put('a', {'PEPTIDE'})
+    with DigestStore(file_name) as store:
+        assert store.get('a') == frozenset({'PEPTIDE'})
+        assert len(store) == 1
+
+
+def test_simulator_is_served_from_store(tmp_path):
+    protease_list = proteases('Trypsin', 'Chymotrypsin')
+    with DigestStore(str(tmp_path / 'digests.db')) as store:
+        first = DigestionSimulator(HEMOGLOBIN_BETA, protease_list, use_cache=False,
+                                   store=store)
+        expected = first.extract_unique_peptide_sequences()
+        assert digest_key(HEMOGLOBIN_BETA, protease_list, 3, 100, 'tree') in store
+
+        second = DigestionSimulator(HEMOGLOBIN_BETA, protease_list, use_cache=False,
+                                    store=store)
+        assert not second._tree_generated
+        assert second.extract_unique_peptide_sequences() == expected
+        assert not second._tree_generated
@@ -0,0 +1,97 @@
+import gzip
+
+import pytest
+
+from digest_simulator.fasta import (fetch_fasta_record, index_fasta, read_fasta,
+                                    read_fasta_index, write_fasta_index)
+
+
+RECORDS = [
+    ('sp|P69905|HBA_HUMAN', 'MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMFLSFPTTKTYFPHF'),
+    ('sp|P68871|HBB_HUMAN', 'MVHLTPEEKSAVTALWGKVNVDEVGGEALGRLLVVYPWTQRFFESFGDLSTPDAVMGNPK'),
+    ('empty', ''),
+    ('P0CG48', 'MQIFVKTLTGKTITLEVEPSDTIENVKAKIQDKEGIPPDQQRLIFAGKQLEDGRTLSDYNIQKESTLHLVLRLRGG'),
+]
+
+
+def fasta_text(records, line_width=10, newline='\n'):
+    lines = []
+    for accession, sequence in records:
+        lines.append(f'>{accession} some description')
+        lines.extend(sequence[i:i + line_width] for i in range(0, len(sequence), line_width))
+    return newline.join(lines) + newline
+
+
+def write(path, text, compress=False):
+    data = text.encode()
+    if compress:
+        data = gzip.compress(data)
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('compress', [False, True], ids=['plain', 'gzip'])
+@pytest.mark.parametrize('newline', ['\n', '\r\n'], ids=['lf', 'crlf'])
+def test_read_fasta(tmp_path, compress, newline):
+    text = fasta_text(RECORDS, newline=newline)
+    file_name = write(tmp_path / 'proteins.fasta', text, compress)
+    assert list(read_fasta(file_name)) == RECORDS
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 16, 64])
+def test_gzip_blocks_smaller_than_a_record(tmp_path, block_size):
+    file_name = write(tmp_path / 'proteins.fasta.gz', fasta_text(RECORDS), compress=True)
+    assert list(read_fasta(file_name, block_size=block_size)) == RECORDS
+
+
+@pytest.mark.parametrize('compress', [False, True], ids=['plain', 'gzip'])
+def test_empty_file(tmp_path, compress):
+    file_name = write(tmp_path / 'empty.fasta', '', compress)
+    assert list(read_fasta(file_name)) == []
+
+
+@pytest.mark.parametrize('compress', [False, True], ids=['plain', 'gzip'])
+def test_records_without_sequence_lines(tmp_path, compress):
+    text = '>first\n>second description\nMKR\n>last'
+    file_name = write(tmp_path / 'proteins.fasta', text, compress)
+    assert list(read_fasta(file_name)) == [('first', ''), ('second', 'MKR'), ('last', '')]
+
+
+def test_missing_final_newline_and_blank_lines(tmp_path):
+    file_name = write(tmp_path / 'proteins.fasta', '>a\nMK\n\nRA \n>b\nGG')
+    assert list(read_fasta(file_name)) == [('a', 'MKRA'), ('b', 'GG')]
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'], ids=['lf', 'crlf'])
+def test_index_round_trip(tmp_path, newline):
+    file_name = write(tmp_path / 'proteins.fasta', fasta_text(RECORDS, newline=newline))
+    index = index_fasta(file_name)
+    assert list(index) == [accession for accession, _ in RECORDS]
+
+    index_file = str(tmp_path / 'proteins.fasta.idx')
+    write_fasta_index(index, index_file)
+    assert read_fasta_index(index_file) == index
+    loaded = read_fasta_index(index_file)
+    for accession, sequence in RECORDS:
+        assert fetch_fasta_record(file_name, loaded, accession) == sequence
+
+
+def test_index_empty_file(tmp_path):
+    assert index_fasta(write(tmp_path / 'empty.fasta', '')) == {}
+
+
+def test_index_rejects_gzip(tmp_path):
+    file_name = write(tmp_path / 'proteins.fasta.gz', fasta_text(RECORDS), compress=True)
+    with pytest.raises(ValueError):
+        index_fasta(file_name)
+
+
+@pytest.mark.parametrize('compress', [False, True], ids=['plain', 'gzip'])
+def test_non_ascii_bytes_are_replaced(tmp_path, compress):
+    data = '>caf\xe9 description\nMK\xe9R\n>b\nGG\n'.encode('latin-1')
+    path = tmp_path / 'proteins.fasta'
+    path.write_bytes(gzip.compress(data) if compress else data)
+    assert list(read_fasta(str(path))) == [('caf\ufffd', 'MK\ufffdR'), ('b', 'GG')]
+    if not compress:
+        index = index_fasta(str(path))
+        assert fetch_fasta_record(str(path), index, 'caf\ufffd') == 'MK\ufffdR'
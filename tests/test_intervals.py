@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.Protease import Protease
+from digest_simulator.intervals import find_site_masks, generate_peptide_intervals
+from digest_simulator.proteases import available_proteases
+
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+HEMOGLOBIN_BETA = ('MVHLTPEEKSAVTALWGKVNVDEVGGEALGRLLVVYPWTQRFFESFGDLSTPDAVMGNPK'
+                   'VKAHGKKVLGAFSDGLAHLDNLKGTFATLSELHCDKLHVDPENFRLLGNVLVCVLAHHFGK'
+                   'EFTPPVQAAYQKVVAGVANALAHKYH')
+
+UBIQUITIN = 'MQIFVKTLTGKTITLEVEPSDTIENVKAKIQDKEGIPPDQQRLIFAGKQLEDGRTLSDYNIQKESTLHLVLRLRGG'
+
+
+def proteases(*names):
+    extra = {
+        'AspN': lambda: Protease('AspN', ['D'], [], 'N'),
+        'LysN': lambda: Protease('LysN', ['K'], ['P'], 'N'),
+    }
+    return [extra[name]() if name in extra else available_proteases[name]() for name in names]
+
+
+PROTEASE_SETS = [
+    ('Trypsin',),
+    ('Trypsin', 'Chymotrypsin'),
+    ('AspN',),
+    ('Trypsin', 'AspN'),
+    ('LysN', 'Chymotrypsin', 'Pepsin'),
+    ('Falcipain2', 'AspN', 'Thrombin'),
+]
+
+
+def random_sequences(count=40, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(0, 70)))
+            for _ in range(count)]
+
+
+def tree_peptides(sequence, protease_list, min_peptide_length, **options):
+    simulator = DigestionSimulator(sequence, protease_list,
+                                   min_peptide_length=min_peptide_length, engine='tree',
+                                   use_cache=False, **options)
+    return simulator.extract_unique_peptide_sequences()
+
+
+def interval_peptides(sequence, protease_list, min_peptide_length):
+    simulator = DigestionSimulator(sequence, protease_list,
+                                   min_peptide_length=min_peptide_length, engine='interval',
+                                   use_cache=False)
+    return simulator.extract_unique_peptide_sequences()
+
+
+@pytest.mark.parametrize('names', PROTEASE_SETS, ids='+'.join)
+@pytest.mark.parametrize('min_peptide_length', [0, 3, 6])
+def test_interval_engine_matches_recursive_tree_on_proteins(names, min_peptide_length):
+    for sequence in (HEMOGLOBIN_BETA, UBIQUITIN):
+        protease_list = proteases(*names)
+        assert interval_peptides(sequence, protease_list, min_peptide_length) == \
+            tree_peptides(sequence, protease_list, min_peptide_length)
+
+
+@pytest.mark.parametrize('names', PROTEASE_SETS, ids='+'.join)
+def test_interval_engine_matches_recursive_tree_on_random_sequences(names):
+    rng = random.Random(1)
+    for sequence in random_sequences():
+        protease_list = proteases(*names)
+        min_peptide_length = rng.randint(0, 4)
+        assert interval_peptides(sequence, protease_list, min_peptide_length) == \
+            tree_peptides(sequence, protease_list, min_peptide_length)
+
+
+@pytest.mark.parametrize('options', [
+    {'traversal': 'depth_first'},
+    {'traversal': 'breadth_first'},
+    {'compact': True},
+    {'compact': True, 'traversal': 'breadth_first'},
+], ids=lambda options: '-'.join(str(value) for value in options.values()))
+def test_tree_variants_match_recursive_tree(options):
+    for sequence in random_sequences(count=20) + [HEMOGLOBIN_BETA]:
+        protease_list = proteases('Trypsin', 'AspN', 'Chymotrypsin')
+        assert tree_peptides(sequence, protease_list, 2, **options) == \
+            tree_peptides(sequence, protease_list, 2)
+
+
+def test_intervals_are_sorted_and_exclude_the_full_sequence():
+    sequence = UBIQUITIN
+    intervals = generate_peptide_intervals(sequence, proteases('Trypsin', 'AspN'))
+    assert intervals == sorted(set(intervals))
+    assert (0, len(sequence)) not in intervals
+    assert all(0 <= start < end <= len(sequence) for start, end in intervals)
+
+
+def test_precomputed_site_masks():
+    protease_list = proteases('Trypsin', 'LysN')
+    site_masks = find_site_masks(UBIQUITIN, protease_list)
+    assert generate_peptide_intervals(UBIQUITIN, protease_list, site_masks=site_masks) == \
+        generate_peptide_intervals(UBIQUITIN, protease_list)
+
+
+def test_sequences_without_sites():
+    for sequence in ('', 'A', 'AAAA'):
+        assert generate_peptide_intervals(sequence, proteases('Trypsin')) == []
+        assert interval_peptides(sequence, proteases('Trypsin'), 0) == set()
+    assert generate_peptide_intervals('AKA', []) == []
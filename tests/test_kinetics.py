@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from digest_simulator.intervals import find_site_masks
+from digest_simulator.kinetics import (kinetic_abundances, simulate_kinetic_digestion,
+                                       site_rates)
+
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN, proteases, random_sequences
+
+
+TIMES = [0.0, 0.05, 0.5, 2.0, 10.0]
+
+
+def dense_abundances(sites, rates, sequence_length, times):
+    positions = [0] + list(sites) + [sequence_length]
+    rates = [0.0] + list(rates) + [0.0]
+    times = np.asarray(times)
+    rows = []
+    for i in range(len(positions)):
+        for j in range(i + 1, len(positions)):
+            cut_start = 1 if i == 0 else 1 - np.exp(-rates[i] * times)
+            cut_end = 1 if j == len(positions) - 1 else 1 - np.exp(-rates[j] * times)
+            inner = sum(rates[i + 1:j])
+            abundance = cut_start * cut_end * np.exp(-inner * times)
+            rows.append((positions[i], positions[j], abundance))
+    return rows
+
+
+def digest(sequence, names=('Trypsin', 'Chymotrypsin'), rates=(1.0, 0.3)):
+    return site_rates(find_site_masks(sequence, proteases(*names)), list(rates))
+
+
+@pytest.mark.parametrize('block_size', [None, 1, 5])
+def test_matches_dense_evaluation(block_size):
+    for sequence in random_sequences(count=20) + [UBIQUITIN]:
+        sites, rates = digest(sequence)
+        starts, ends, abundances = kinetic_abundances(sites, rates, len(sequence), TIMES,
+                                                      block_size=block_size)
+        expected = dense_abundances(sites, rates, len(sequence), TIMES)
+        assert list(zip(starts.tolist(), ends.tolist())) == \
+            [(start, end) for start, end, _ in expected]
+        assert np.allclose(abundances, [row for _, _, row in expected], rtol=1e-12, atol=0)
+
+
+@pytest.mark.parametrize('min_abundance', [0.0, 1e-3, 0.1])
+@pytest.mark.parametrize('min_length', [0, 4])
+@pytest.mark.parametrize('max_missed_cleavages', [None, 2])
+def test_filters_match_filtering_afterwards(min_abundance, min_length, max_missed_cleavages):
+    for sequence in random_sequences(count=10) + [HEMOGLOBIN_BETA]:
+        sites, rates = digest(sequence)
+        starts, ends, abundances = kinetic_abundances(
+            sites, rates, len(sequence), TIMES, max_missed_cleavages=max_missed_cleavages)
+        keep = (ends - starts > min_length) & (abundances.max(axis=1) > min_abundance)
+        filtered = kinetic_abundances(
+            sites, rates, len(sequence), TIMES, max_missed_cleavages=max_missed_cleavages,
+            min_length=min_length, min_abundance=min_abundance, block_size=3)
+        assert np.array_equal(filtered[0], starts[keep])
+        assert np.array_equal(filtered[1], ends[keep])
+        assert np.array_equal(filtered[2], abundances[keep])
+
+
+def test_residues_are_conserved():
+    sequence = HEMOGLOBIN_BETA
+    df = simulate_kinetic_digestion(sequence, proteases('Trypsin', 'AspN'), [1.0, 0.2], TIMES)
+    lengths = (df['End'] - df['Start']).to_numpy()
+    assert np.allclose(lengths @ df[TIMES].to_numpy(), len(sequence))
+    # only the intact sequence is present at the start
+    intact = (df['Start'] == 0) & (df['End'] == len(sequence))
+    assert df.loc[intact, 0.0].tolist() == [1.0]
+    assert not df.loc[~intact, 0.0].any()
+    assert df['Peptide'].tolist() == \
+        [sequence[start:end] for start, end in zip(df['Start'], df['End'])]
+
+
+def test_site_rates():
+    site_masks = find_site_masks('AKRPAFK', proteases('Trypsin', 'Chymotrypsin'))
+    sites, rates = site_rates(site_masks, [1.0, 0.5])
+    assert sites.tolist() == [2, 6]
+    assert rates.tolist() == [1.0, 0.5]
+    with pytest.raises(ValueError):
+        site_rates(find_site_masks('AKA', proteases('Trypsin')), [1.0, 2.0])
+    with pytest.raises(ValueError):
+        site_rates(find_site_masks('AKA', proteases('Trypsin')), -1.0)
@@ -0,0 +1,68 @@
+import csv
+
+import numpy as np
+import pytest
+
+from digest_simulator.mass import (mz_values, neutral_masses, peptide_mass, peptide_masses,
+                                   sequence_masses)
+from digest_simulator.tools import write_proteins_to_mascot_csv_file
+
+from .test_intervals import HEMOGLOBIN_BETA, random_sequences
+
+
+# reference masses of the free amino acid and of common test peptides
+@pytest.mark.parametrize('peptide, monoisotopic, average', [
+    ('G', 75.032028, 75.0666),
+    ('W', 204.089878, 204.2252),
+    ('PEPTIDE', 799.359964, 799.8231),
+    ('MQIFVK', 764.425483, 764.9757),
+    ('', 18.010565, 18.01528),
+], ids=['glycine', 'tryptophan', 'peptide', 'mqifvk', 'water'])
+def test_known_masses(peptide, monoisotopic, average):
+    assert peptide_mass(peptide) == pytest.approx(monoisotopic, abs=1e-5)
+    assert peptide_mass(peptide, 'average') == pytest.approx(average, abs=1e-3)
+
+
+@pytest.mark.parametrize('kind', ['monoisotopic', 'average'])
+def test_peptide_masses_match_peptide_mass(kind):
+    sequence = (HEMOGLOBIN_BETA[:40] + 'X' + HEMOGLOBIN_BETA[40:90] + 'BZ'
+                + HEMOGLOBIN_BETA[90:])
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, len(sequence), 500)
+    ends = np.minimum(starts + rng.integers(0, 30, 500), len(sequence))
+    masses = peptide_masses(sequence, starts, ends, kind)
+    peptides = [sequence[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+    expected = [peptide_mass(peptide, kind) for peptide in peptides]
+    assert np.allclose(masses, expected, rtol=0, atol=1e-8, equal_nan=True)
+    # only peptides with a residue without a mass have none
+    unknown = [any(residue in 'XBZ' for residue in peptide) for peptide in peptides]
+    assert np.isnan(masses).tolist() == unknown
+    assert any(unknown) and not all(unknown)
+
+
+def test_sequence_masses():
+    peptides = random_sequences(count=30) + ['', 'PEPXIDE', 'X']
+    masses = sequence_masses(peptides)
+    assert np.allclose(masses, [peptide_mass(peptide) for peptide in peptides],
+                       rtol=0, atol=1e-8, equal_nan=True)
+    assert np.isnan(masses).tolist() == ['X' in peptide for peptide in peptides]
+    assert len(sequence_masses([])) == 0
+
+
+def test_mz_round_trip():
+    masses = np.array([799.359964, 1500.0])
+    for charge in (1, 2, 3):
+        assert np.allclose(neutral_masses(mz_values(masses, charge), charge), masses)
+    assert mz_values(799.359964, 2) == pytest.approx(400.687258, abs=1e-6)
+
+
+def test_mascot_csv_masses(tmp_path):
+    file_name = str(tmp_path / 'output.csv')
+    write_proteins_to_mascot_csv_file(['PEPTIDE', 'PEPXIDE', 'MQIFVK'], file_name=file_name)
+    with open(file_name, newline='') as f:
+        rows = list(csv.reader(f))
+    header = rows[3]
+    column = header.index('pep_calc_mr')
+    assert [row[header.index('pep_seq')] for row in rows[4:7]] == \
+        ['PEPTIDE', 'PEPXIDE', 'MQIFVK']
+    assert [row[column] for row in rows[4:7]] == ['799.359965', '-1', '764.425483']
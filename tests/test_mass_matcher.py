@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.MassMatcher import MassMatcher
+from digest_simulator.batch import digest_records
+from digest_simulator.mass import PROTON_MASS, mz_values, peptide_mass
+
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN, proteases
+
+
+def brute_force(matcher, observed, charges, tolerance, unit):
+    matches = []
+    for i, value in enumerate(observed):
+        for charge in charges or [0]:
+            query = (value - PROTON_MASS) * charge if charge else value
+            window = query * tolerance * 1e-6 if unit == 'ppm' else tolerance
+            for j, mass in enumerate(matcher.masses):
+                if query - window <= mass <= query + window:
+                    matches.append((i, charge, j))
+    return sorted(matches)
+
+
+def matched(matcher, observed, charges, tolerance, unit):
+    query_indices, query_charges, query_masses, peptide_indices = matcher.match_indices(
+        observed, charges=charges, tolerance=tolerance, unit=unit)
+    return sorted(zip(query_indices.tolist(), query_charges.tolist(),
+                      peptide_indices.tolist()))
+
+
+def digest_matcher():
+    simulator = DigestionSimulator(HEMOGLOBIN_BETA, proteases('Trypsin', 'Chymotrypsin'),
+                                   engine='interval', use_cache=False)
+    return MassMatcher.from_simulator(simulator)
+
+
+def observed_values(matcher, seed=0):
+    rng = np.random.default_rng(seed)
+    masses = rng.choice(matcher.masses, 30)
+    charges = rng.integers(1, 5, 30)
+    # jitter the ions around the predicted values and add some that match nothing
+    observed = mz_values(masses + rng.normal(0, 0.01, 30), charges)
+    return np.concatenate((observed, rng.uniform(200, 2000, 20)))
+
+
+@pytest.mark.parametrize('charges', [(1, 2, 3, 4), (2,), None], ids=['1-4', '2', 'neutral'])
+@pytest.mark.parametrize('tolerance, unit', [(10.0, 'ppm'), (50.0, 'ppm'), (0.02, 'Da'),
+                                             (1.0, 'Da')])
+def test_matches_brute_force(charges, tolerance, unit):
+    matcher = digest_matcher()
+    observed = observed_values(matcher)
+    assert matched(matcher, observed, charges, tolerance, unit) == \
+        brute_force(matcher, observed, charges, tolerance, unit)
+
+
+def test_peptide_seen_at_two_charges():
+    matcher = MassMatcher(['PEPTIDE', 'MQIFVK', 'PEPTIDX'])
+    assert len(matcher) == 2
+    mass = peptide_mass('PEPTIDE')
+    assert mass == pytest.approx(799.359964, abs=1e-5)
+    df = matcher.match([mz_values(mass, 1), mz_values(mass, 2) + 0.001], tolerance=5.0)
+    assert df['Peptide'].tolist() == ['PEPTIDE', 'PEPTIDE']
+    assert df['Query'].tolist() == [0, 1]
+    assert df['Charge'].tolist() == [1, 2]
+    assert df['Delta_ppm'].abs().max() < 5.0
+    # the same offset is outside a 1 ppm window
+    assert matcher.match([mz_values(mass, 2) + 0.001], tolerance=1.0).empty
+
+
+def test_from_tsv_and_from_records(tmp_path):
+    records = digest_records([('hbb', HEMOGLOBIN_BETA), ('ubiquitin', UBIQUITIN)],
+                             ['Trypsin'])
+    file_name = tmp_path / 'peptides.tsv'
+    file_name.write_text('accession\tpeptide\n' + ''.join(
+        f'{accession}\t{peptide}\n' for accession, peptides in records
+        for peptide in peptides))
+    from_records = MassMatcher.from_records(records)
+    from_tsv = MassMatcher.from_tsv(str(file_name))
+    assert len(from_records) == sum(len(peptides) for _, peptides in records)
+    assert from_tsv.peptides.tolist() == from_records.peptides.tolist()
+    assert from_tsv.proteins.tolist() == from_records.proteins.tolist()
+    assert np.array_equal(from_tsv.masses, from_records.masses)
+
+    observed = observed_values(from_records, seed=1)
+    df = from_records.match(observed, tolerance=0.05, unit='Da')
+    assert len(df) == len(brute_force(from_records, observed, (1, 2, 3, 4), 0.05, 'Da'))
+    pairs = {(peptide, accession) for accession, peptides in records for peptide in peptides}
+    assert set(zip(df['Peptide'], df['Protein'])) <= pairs
+
+
+def test_empty_matcher():
+    matcher = MassMatcher([])
+    assert len(matcher) == 0
+    assert matched(matcher, [500.0, 1000.0], (1, 2), 10.0, 'ppm') == []
+    df = matcher.match([500.0])
+    assert df.empty
+    assert 'Protein' not in df
+    assert matched(digest_matcher(), [], (1, 2), 10.0, 'ppm') == []
+
+
+def test_rejects_unknown_unit():
+    with pytest.raises(ValueError):
+        digest_matcher().match_indices([500.0], unit='mmu')
@@ -0,0 +1,71 @@
+import pytest
+
+from digest_simulator.DigestCache import digest_key, digest_method
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.intervals import generate_missed_cleavage_intervals
+
+from .test_intervals import (HEMOGLOBIN_BETA, UBIQUITIN, PROTEASE_SETS, proteases,
+                             random_sequences)
+
+
+def reference_intervals(sequence, protease_list, max_missed_cleavages, min_length):
+    sites = sorted({site for protease in protease_list
+                    for site in protease.cleavage_sites(sequence)})
+    bounds = [0] + sites + [len(sequence)]
+    return sorted((bounds[i], bounds[j])
+                  for i in range(len(bounds))
+                  for j in range(i + 1, min(len(bounds), i + max_missed_cleavages + 2))
+                  if bounds[j] - bounds[i] > min_length
+                  and (bounds[i], bounds[j]) != (0, len(sequence)))
+
+
+@pytest.mark.parametrize('names', PROTEASE_SETS, ids='+'.join)
+@pytest.mark.parametrize('max_missed_cleavages', [0, 1, 2, 5])
+@pytest.mark.parametrize('min_length', [0, 3])
+def test_matches_reference(names, max_missed_cleavages, min_length):
+    protease_list = proteases(*names)
+    for sequence in random_sequences(count=20) + [HEMOGLOBIN_BETA, UBIQUITIN]:
+        intervals = generate_missed_cleavage_intervals(sequence, protease_list,
+                                                       max_missed_cleavages,
+                                                       min_length=min_length)
+        assert intervals == reference_intervals(sequence, protease_list, max_missed_cleavages,
+                                                min_length)
+
+
+@pytest.mark.parametrize('name', ['Trypsin', 'Chymotrypsin', 'AspN', 'LysN'])
+@pytest.mark.parametrize('min_peptide_length', [0, 3])
+def test_no_missed_cleavages_matches_recursive_tree_for_one_protease(name, min_peptide_length):
+    # one protease cuts every site at once, so the tree holds only fully cleaved peptides
+    for sequence in random_sequences(count=20) + [HEMOGLOBIN_BETA, UBIQUITIN]:
+        missed = DigestionSimulator(sequence, proteases(name),
+                                    min_peptide_length=min_peptide_length,
+                                    max_missed_cleavages=0, use_cache=False)
+        tree = DigestionSimulator(sequence, proteases(name),
+                                  min_peptide_length=min_peptide_length, engine='tree',
+                                  use_cache=False)
+        assert missed.extract_unique_peptide_sequences() == \
+            tree.extract_unique_peptide_sequences()
+
+
+def test_output_grows_linearly():
+    protease_list = proteases('Trypsin')
+    sequence = HEMOGLOBIN_BETA * 20
+    n_sites = len(protease_list[0].cleavage_sites(sequence))
+    for k in range(4):
+        intervals = generate_missed_cleavage_intervals(sequence, protease_list, k)
+        assert len(intervals) <= (k + 1) * (n_sites + 1)
+
+
+def test_cache_keys_depend_on_k():
+    protease_list = proteases('Trypsin', 'AspN')
+    keys = {digest_key(UBIQUITIN, protease_list, 3, 100, digest_method(max_missed_cleavages=k))
+            for k in range(3)}
+    assert len(keys) == 3
+    method = digest_method(max_missed_cleavages=1)
+    assert digest_key(UBIQUITIN, protease_list, 3, 100, method) == \
+        digest_key(UBIQUITIN, protease_list[::-1], 3, None, method)
+
+
+def test_negative_bound():
+    with pytest.raises(ValueError):
+        generate_missed_cleavage_intervals(UBIQUITIN, proteases('Trypsin'), -1)
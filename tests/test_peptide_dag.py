@@ -0,0 +1,60 @@
+import pytest
+
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.PeptideDAG import build_peptide_dag
+from digest_simulator.intervals import generate_peptide_intervals
+
+from .test_intervals import (HEMOGLOBIN_BETA, UBIQUITIN, PROTEASE_SETS, proteases,
+                             random_sequences)
+
+
+@pytest.mark.parametrize('names', PROTEASE_SETS, ids='+'.join)
+@pytest.mark.parametrize('min_peptide_length', [0, 3])
+def test_dag_engine_matches_recursive_tree(names, min_peptide_length):
+    for sequence in random_sequences(count=20) + [HEMOGLOBIN_BETA, UBIQUITIN]:
+        protease_list = proteases(*names)
+        dag = DigestionSimulator(sequence, protease_list,
+                                 min_peptide_length=min_peptide_length, engine='dag',
+                                 use_cache=False)
+        tree = DigestionSimulator(sequence, protease_list,
+                                  min_peptide_length=min_peptide_length, engine='tree',
+                                  use_cache=False)
+        assert dag.extract_unique_peptide_sequences() == \
+            tree.extract_unique_peptide_sequences()
+        assert dag.peptide_intervals == generate_peptide_intervals(
+            sequence, protease_list, min_length=min_peptide_length)
+
+
+def test_repeated_peptides_keep_their_positions():
+    # GGGK occurs three times; the tree keeps it once, the DAG once per position
+    sequence = 'GGGKAAAFGGGKCCCFGGGK'
+    dag = build_peptide_dag(sequence, proteases('Trypsin', 'Chymotrypsin'))
+    positions = [(start, end) for start, end in dag.intervals()
+                 if sequence[start:end] == 'GGGK']
+    assert positions == [(0, 4), (8, 12), (16, 20)]
+
+
+def test_shared_nodes_have_one_edge_per_parent():
+    sequence = UBIQUITIN
+    protease_list = proteases('Trypsin', 'AspN')
+    dag = build_peptide_dag(sequence, protease_list)
+    assert len(dag.index) == len(dag)
+    for node in range(1, len(dag)):
+        start, end = dag.starts[node], dag.ends[node]
+        assert dag.peptide(node) == sequence[start:end]
+        assert dag.node(start, end) == node
+        parents = dag.parents(node)
+        assert parents
+        for parent in parents:
+            assert dag.starts[parent] <= start and end <= dag.ends[parent]
+            assert node in dag.children(parent)
+            assert dag.depths[node] <= dag.depths[parent] + 1
+        assert min(dag.depths[parent] for parent in parents) == dag.depths[node] - 1
+    assert any(len(dag.parents(node)) > 1 for node in range(1, len(dag)))
+
+
+def test_max_depth_limits_expansion():
+    protease_list = proteases('Trypsin', 'Chymotrypsin')
+    dag = build_peptide_dag(HEMOGLOBIN_BETA, protease_list, max_depth=1)
+    assert set(dag.depths.tolist()) == {0, 1}
+    assert build_peptide_dag(HEMOGLOBIN_BETA, protease_list, max_depth=0).intervals() == []
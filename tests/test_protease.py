@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from digest_simulator.Protease import Protease, encode_sequence
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.proteases import Trypsin, available_proteases
+from digest_simulator.tools import calculate_possible_cleavage_sites
+
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def reference_cleave(protease, sequence):
+    """The residue-by-residue cleave loop the vectorized site mask replaced."""
+    peptides = []
+    start = 0
+    if protease.cleavage_position == 'C':
+        for i in range(len(sequence) - 1):
+            if (sequence[i] in protease.cleavage_residues
+                    and sequence[i + 1] not in protease.no_cleavage_after):
+                peptides.append(sequence[start:i + 1])
+                start = i + 1
+    else:
+        for i in range(1, len(sequence)):
+            if (sequence[i] in protease.cleavage_residues
+                    and sequence[i - 1] not in protease.no_cleavage_after):
+                peptides.append(sequence[start:i])
+                start = i
+    peptides.append(sequence[start:])
+    return peptides
+
+
+def all_proteases():
+    proteases = [protease() for protease in available_proteases.values()]
+    proteases.append(Protease('AspN', ['D'], [], 'N'))
+    proteases.append(Protease('LysN', ['K'], ['P'], 'N'))
+    return proteases
+
+
+def random_sequences(count=100, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(0, 60)))
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize('protease', all_proteases(), ids=lambda protease: protease.name)
+def test_cleave_matches_reference(protease):
+    for sequence in random_sequences():
+        assert protease.cleave(sequence) == reference_cleave(protease, sequence)
+
+
+def test_invalid_cleavage_position():
+    protease = Protease('Broken', ['K'], [], 'X')
+    with pytest.raises(ValueError):
+        protease.cleave('AAKAA')
+    with pytest.raises(ValueError):
+        protease.cleave('')
+
+
+def test_encode_sequence_keeps_positions_of_non_ascii():
+    codes = encode_sequence('MKÄR😀K')
+    assert len(codes) == 6
+    assert bytes(codes) == b'MK?R?K'
+
+
+def test_non_ascii_residues_are_not_sites():
+    assert Trypsin().cleave('MKÄRAÜKA') == ['MK', 'ÄR', 'AÜK', 'A']
+    for engine in ('tree', 'interval', 'dag'):
+        simulator = DigestionSimulator('MKÄRAAAKÜÜÜR', [Trypsin()], min_peptide_length=0,
+                                       engine=engine, use_cache=False)
+        assert simulator.extract_unique_peptide_sequences() == {'MK', 'ÄR', 'AAAK', 'ÜÜÜR'}
+
+
+@pytest.mark.parametrize('protease', all_proteases(), ids=lambda protease: protease.name)
+def test_calculate_possible_cleavage_sites(protease):
+    for sequence in random_sequences():
+        assert calculate_possible_cleavage_sites(protease, sequence) == \
+            len(reference_cleave(protease, sequence)) - 1
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.ProteasePredictor import ProteasePredictor
+
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN, proteases
+
+
+NAMES = ('Trypsin', 'Chymotrypsin', 'Pepsin', 'Elastase', 'Thrombin', 'AspN', 'LysN')
+
+
+def observed_peptides(sequence, names, fraction=0.7, seed=0):
+    rng = random.Random(seed)
+    simulator = DigestionSimulator(sequence, proteases(*names), min_peptide_length=3,
+                                   use_cache=False)
+    peptides = sorted(simulator.extract_unique_peptide_sequences())
+    return rng.sample(peptides, int(len(peptides) * fraction)) + ['WWWWW']
+
+
+def rows(df):
+    return list(zip(df['Protease'], df['Matched_Peptides'], df['Score']))
+
+
+def assert_top_k(searched, predicted, top_k):
+    expected = predicted.head(top_k)
+    assert len(searched) == len(expected)
+    assert searched['Score'].tolist() == pytest.approx(expected['Score'].tolist(), abs=1e-12)
+    # rows tied with the k-th score may be any of the tied combinations
+    cutoff = expected['Score'].iloc[-1] + 1e-12
+    assert {row for row in rows(searched) if row[2] > cutoff} == \
+        {row for row in rows(expected) if row[2] > cutoff}
+    assert set(rows(searched)) <= set(rows(predicted))
+
+
+@pytest.mark.parametrize('sequence, digested_with', [
+    (HEMOGLOBIN_BETA, ('Trypsin',)),
+    (HEMOGLOBIN_BETA, ('Chymotrypsin', 'AspN')),
+    (UBIQUITIN, ('LysN', 'Pepsin')),
+], ids=['trypsin', 'chymotrypsin+aspn', 'lysn+pepsin'])
+@pytest.mark.parametrize('top_k', [1, 3, 10, 200])
+def test_search_matches_predict(sequence, digested_with, top_k):
+    peptides = observed_peptides(sequence, digested_with)
+    predictor = ProteasePredictor(sequence, proteases(*NAMES), use_cache=False)
+    predicted = predictor.predict(peptides)
+    assert_top_k(predictor.search(peptides, top_k=top_k), predicted, top_k)
+
+
+def test_search_statistics():
+    peptides = observed_peptides(HEMOGLOBIN_BETA, ('Trypsin',))
+    predictor = ProteasePredictor(HEMOGLOBIN_BETA, proteases(*NAMES), use_cache=False)
+    assert predictor.search_statistics is None
+    predictor.search(peptides, top_k=3)
+    statistics = predictor.search_statistics
+    assert set(statistics) == {'combinations', 'visited', 'pruned_subtrees', 'pruned'}
+    assert statistics['combinations'] == 2 ** len(NAMES) - 1
+    assert statistics['visited'] + statistics['pruned'] == statistics['combinations']
+    assert statistics['pruned_subtrees'] > 0
+
+    predictor.search(peptides, top_k=2 ** len(NAMES))
+    assert predictor.search_statistics['visited'] == statistics['combinations']
+    assert predictor.search_statistics['pruned'] == 0
+
+
+@pytest.mark.parametrize('top_k', [0, -1])
+def test_search_rejects_top_k_below_one(top_k):
+    predictor = ProteasePredictor(UBIQUITIN, proteases('Trypsin', 'AspN'), use_cache=False)
+    with pytest.raises(ValueError):
+        predictor.search(['MQIFVK'], top_k=top_k)
+
+
+def test_predict_is_independent_of_workers():
+    peptides = observed_peptides(UBIQUITIN, ('Trypsin', 'AspN'))
+    protease_list = proteases('Trypsin', 'Chymotrypsin', 'AspN', 'LysN')
+    predictor = ProteasePredictor(UBIQUITIN, protease_list, use_cache=False)
+    serial = predictor.predict(peptides)
+    parallel = predictor.predict(peptides, workers=2, chunks_per_worker=2)
+    assert set(rows(parallel)) == set(rows(serial))
+
+
+@pytest.mark.parametrize('as_dict', [True, False], ids=['dict', 'list'])
+def test_predict_samples_matches_predict(as_dict):
+    samples = [
+        observed_peptides(UBIQUITIN, ('Trypsin',)),
+        observed_peptides(UBIQUITIN, ('LysN', 'Pepsin'), fraction=0.3, seed=1),
+        [],
+        ['WWWWW', 'NOTAPEPTIDE'],
+        observed_peptides(UBIQUITIN, ('AspN',), seed=2) * 2,
+    ]
+    names = ['trypsin', 'lysn+pepsin', 'empty', 'unknown', 'repeated']
+    predictor = ProteasePredictor(UBIQUITIN, proteases(*NAMES[:5], 'AspN', 'LysN'),
+                                  use_cache=False)
+    predicted = predictor.predict_samples(dict(zip(names, samples)) if as_dict else samples)
+    assert list(predicted.columns) == ['Sample', 'Protease', 'Matched_Peptides', 'Score']
+    assert predicted['Sample'].unique().tolist() == (names if as_dict else [0, 1, 2, 3, 4])
+    for sample_name, peptides in zip(predicted['Sample'].unique(), samples):
+        df = predicted[predicted['Sample'] == sample_name]
+        expected = predictor.predict(peptides)
+        assert df['Score'].is_monotonic_decreasing
+        df, expected = df.sort_values('Protease'), expected.sort_values('Protease')
+        assert df['Protease'].tolist() == expected['Protease'].tolist()
+        assert df['Matched_Peptides'].tolist() == expected['Matched_Peptides'].tolist()
+        assert df['Score'].tolist() == pytest.approx(expected['Score'].tolist(), abs=1e-12)
+
+
+def test_predict_samples_without_samples():
+    predictor = ProteasePredictor(UBIQUITIN, proteases('Trypsin', 'AspN'), use_cache=False)
+    assert predictor.predict_samples([]).empty
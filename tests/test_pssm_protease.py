@@ -0,0 +1,113 @@
+import random
+
+import numpy as np
+import pytest
+
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.PSSMProtease import PSSMProtease
+from digest_simulator.Protease import encode_sequence
+from digest_simulator.ProteasePredictor import ProteasePredictor
+from digest_simulator.proteases import Chymotrypsin, Trypsin
+from digest_simulator.tools import calculate_possible_cleavage_sites
+
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def trypsin_like():
+    scores = {residue: [0.0] * 8 for residue in AMINO_ACIDS}
+    scores['K'][3] = scores['R'][3] = 1.0
+    scores['P'][4] = -10.0
+    return PSSMProtease('TrypsinLike', scores, threshold=1.0)
+
+
+def caspase_like(seed=0):
+    rng = random.Random(seed)
+    windows = [''.join(rng.choice(AMINO_ACIDS) for _ in range(2)) + rng.choice('DE') + 'D'
+               + rng.choice('GSA') + ''.join(rng.choice(AMINO_ACIDS) for _ in range(3))
+               for _ in range(200)]
+    return PSSMProtease.from_sites('CaspaseLike', windows, threshold=2.0)
+
+
+def random_sequences(count=50, length=80, seed=1):
+    rng = random.Random(seed)
+    # enrich D and E so the caspase-like matrix finds sites
+    alphabet = AMINO_ACIDS + 'DDEEGS'
+    return [''.join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+
+def test_trypsin_like_matrix_matches_trypsin():
+    rng = random.Random(2)
+    protease = trypsin_like()
+    for _ in range(100):
+        sequence = ''.join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(0, 60)))
+        assert protease.cleave(sequence) == Trypsin().cleave(sequence)
+
+
+def test_base_protease_helpers():
+    protease = trypsin_like()
+    assert protease.cleavage_position == 'C'
+    assert calculate_possible_cleavage_sites(protease, 'AAKAAKPARA') == 2
+
+
+@pytest.mark.parametrize('protease', [caspase_like(), trypsin_like()], ids=lambda p: p.name)
+def test_engines_agree(protease):
+    for sequence in random_sequences():
+        proteases = [protease, Chymotrypsin()]
+        expected = DigestionSimulator(sequence, proteases, engine='interval',
+                                      use_cache=False).extract_unique_peptide_sequences()
+        for options in ({'engine': 'tree'},
+                        {'engine': 'tree', 'traversal': 'depth_first'},
+                        {'engine': 'tree', 'traversal': 'breadth_first'},
+                        {'engine': 'tree', 'compact': True},
+                        {'engine': 'dag'}):
+            simulator = DigestionSimulator(sequence, proteases, use_cache=False, **options)
+            assert simulator.extract_unique_peptide_sequences() == expected, options
+
+
+def test_tree_positions_use_full_sequence_sites():
+    protease = caspase_like()
+    for sequence in random_sequences(count=10):
+        simulator = DigestionSimulator(sequence, [protease], min_peptide_length=0,
+                                       use_cache=False)
+        sites = set(protease.cleavage_sites(sequence)) | {0, len(sequence)}
+        starts, ends = simulator.peptide_coverage()
+        assert set(starts.tolist()) <= sites
+        assert set(ends.tolist()) <= sites
+
+
+def test_predictor_scores_the_simulated_digest():
+    protease = caspase_like()
+    for sequence in random_sequences(count=10):
+        predictor = ProteasePredictor(sequence, [protease, Chymotrypsin()], use_cache=False)
+        simulated = DigestionSimulator(sequence, [protease], use_cache=False)
+        assert predictor._simulated_cleave([protease]) == \
+            simulated.extract_unique_peptide_sequences()
+
+
+def test_definition_identifies_the_matrix():
+    assert trypsin_like().definition() == trypsin_like().definition()
+    assert caspase_like(0).definition() != caspase_like(1).definition()
+
+
+def test_score_sequences_matches_single_sequences():
+    protease = caspase_like()
+    rng = random.Random(3)
+    sequences = [''.join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(0, 50)))
+                 for _ in range(100)]
+    for sequence, scores in zip(sequences, protease.score_sequences(sequences)):
+        assert np.allclose(scores, protease.site_scores(encode_sequence(sequence)))
+
+
+def test_site_probabilities():
+    protease = trypsin_like()
+    probabilities = protease.site_probabilities(encode_sequence('AKAKPA'))
+    assert probabilities.shape == (5,)
+    assert np.allclose(probabilities[[1, 3]], [0.5, 1 / (1 + np.exp(10))])
+
+
+def test_invalid_matrix():
+    with pytest.raises(ValueError):
+        PSSMProtease('Bad', {'A': [0, 0], 'K': [0]})
+    with pytest.raises(ValueError):
+        PSSMProtease('Bad', {'A': [0, 0]}, n_nonprime=2)
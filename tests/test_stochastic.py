@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from digest_simulator.intervals import find_site_masks
+from digest_simulator.stochastic import (expected_abundances, simulate_stochastic_digestion,
+                                         site_probabilities)
+
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN, proteases
+
+
+def intervals(df):
+    return list(zip(df['Start'].tolist(), df['End'].tolist()))
+
+
+@pytest.mark.parametrize('efficiencies', [0.5, [0.9, 0.2]], ids=['shared', 'per-protease'])
+@pytest.mark.parametrize('batch_size', [None, 333])
+def test_abundances_within_bounds_of_expected(efficiencies, batch_size):
+    protease_list = proteases('Trypsin', 'AspN')
+    df = simulate_stochastic_digestion(UBIQUITIN, protease_list, efficiencies,
+                                       replicates=5000, confidence=0.9999, seed=0,
+                                       batch_size=batch_size)
+    expected = expected_abundances(UBIQUITIN, df['Start'], df['End'], protease_list,
+                                   efficiencies)
+    assert np.all(df['CI_Lower'] <= expected)
+    assert np.all(expected <= df['CI_Upper'])
+    assert np.allclose(df['Abundance'], df['Count'] / 5000)
+    assert df['Peptide'].tolist() == \
+        [UBIQUITIN[start:end] for start, end in intervals(df)]
+    # residues are conserved in every molecule
+    lengths = (df['End'] - df['Start']).to_numpy()
+    assert lengths @ df['Count'].to_numpy() == 5000 * len(UBIQUITIN)
+
+
+def test_is_reproducible_with_seed():
+    protease_list = proteases('Trypsin')
+    first = simulate_stochastic_digestion(HEMOGLOBIN_BETA, protease_list, 0.7, seed=3)
+    second = simulate_stochastic_digestion(HEMOGLOBIN_BETA, protease_list, 0.7, seed=3,
+                                           batch_size=7)
+    assert first.equals(second)
+
+
+def test_no_sites():
+    df = simulate_stochastic_digestion('WWWWW', proteases('Trypsin'), 0.5, replicates=10)
+    assert intervals(df) == [(0, 5)]
+    assert df['Count'].tolist() == [10]
+    assert df['Abundance'].tolist() == [1.0]
+    assert expected_abundances('WWWWW', [0], [5], proteases('Trypsin'), 0.5).tolist() == [1.0]
+
+
+def test_efficiency_one_cuts_every_site():
+    protease_list = proteases('Trypsin')
+    df = simulate_stochastic_digestion(UBIQUITIN, protease_list, 1.0, replicates=20)
+    sites, _ = site_probabilities(find_site_masks(UBIQUITIN, protease_list), 1.0)
+    positions = [0] + sites.tolist() + [len(UBIQUITIN)]
+    assert intervals(df) == list(zip(positions[:-1], positions[1:]))
+    assert df['Count'].tolist() == [20] * (len(sites) + 1)
+    expected = expected_abundances(UBIQUITIN, df['Start'], df['End'], protease_list, 1.0)
+    assert expected.tolist() == [1.0] * len(df)
+    # a peptide spanning a site that is always cut never occurs
+    assert expected_abundances(UBIQUITIN, [0], [len(UBIQUITIN)], protease_list,
+                               1.0).tolist() == [0.0]
+
+
+def test_efficiency_zero_keeps_sequence_intact():
+    df = simulate_stochastic_digestion(UBIQUITIN, proteases('Trypsin', 'AspN'), 0.0,
+                                       replicates=20)
+    assert intervals(df) == [(0, len(UBIQUITIN))]
+    assert df['Abundance'].tolist() == [1.0]
+
+
+def test_per_position_efficiencies():
+    protease_list = proteases('Trypsin', 'AspN')
+    site_masks = find_site_masks(UBIQUITIN, protease_list)
+    # Trypsin only cuts its first site, AspN none of its sites
+    trypsin = np.zeros(len(site_masks[0]))
+    first = np.flatnonzero(site_masks[0])[0]
+    trypsin[first] = 1.0
+    df = simulate_stochastic_digestion(UBIQUITIN, protease_list,
+                                       [trypsin, np.zeros(len(site_masks[1]))],
+                                       replicates=50, site_masks=site_masks)
+    assert intervals(df) == [(0, first + 1), (first + 1, len(UBIQUITIN))]
+    assert df['Count'].tolist() == [50, 50]
+
+
+@pytest.mark.parametrize('efficiencies', [-0.1, 1.5, [0.5, 2.0]],
+                         ids=['negative', 'above-one', 'one-above-one'])
+def test_rejects_out_of_range_efficiencies(efficiencies):
+    with pytest.raises(ValueError):
+        simulate_stochastic_digestion(UBIQUITIN, proteases('Trypsin', 'AspN'), efficiencies)
+    with pytest.raises(ValueError):
+        expected_abundances(UBIQUITIN, [0], [5], proteases('Trypsin', 'AspN'), efficiencies)
+
+
+def test_rejects_one_efficiency_per_wrong_protease_count():
+    with pytest.raises(ValueError):
+        simulate_stochastic_digestion(UBIQUITIN, proteases('Trypsin', 'AspN'), [0.5])
+
+
+@pytest.mark.parametrize('replicates', [0, -5])
+def test_rejects_replicates_below_one(replicates):
+    with pytest.raises(ValueError):
+        simulate_stochastic_digestion(UBIQUITIN, proteases('Trypsin'), 0.5,
+                                      replicates=replicates)
@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+import pytest
+
+from digest_simulator.SuffixArray import SuffixArray, build_suffix_array
+from digest_simulator.tools import find_peptide_positions
+
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN
+
+
+PATTERNS = ['A', 'AA', 'AAAA', 'AAAAAAA', 'AAAAAAAA', 'K', 'GK', 'KK', 'VKAHGKK', 'LVLRLRGG',
+            'HLVLRL', 'MVHL', 'W', 'X']
+
+
+def sequences(seed=0):
+    rng = random.Random(seed)
+    # a small alphabet gives many repeats
+    random_sequences = [''.join(rng.choice('AGK') for _ in range(rng.randint(0, 40)))
+                        for _ in range(30)]
+    return random_sequences + ['AAAAAAA', 'GKGKGKGK', HEMOGLOBIN_BETA, UBIQUITIN, '']
+
+
+def patterns(sequence, rng):
+    sampled = []
+    for _ in range(10):
+        start = rng.randint(0, len(sequence))
+        sampled.append(sequence[start:start + rng.randint(1, 6)] or 'A')
+    return PATTERNS + sampled
+
+
+def test_suffix_array_is_sorted():
+    for sequence in sequences():
+        codes = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+        suffix_array = build_suffix_array(codes)
+        assert [sequence[start:] for start in suffix_array] == \
+            sorted(sequence[i:] for i in range(len(sequence)))
+
+
+def test_find_matches_scan():
+    rng = random.Random(1)
+    for sequence in sequences():
+        index = SuffixArray(sequence)
+        for peptide in patterns(sequence, rng):
+            expected = find_peptide_positions(sequence, peptide)
+            assert find_peptide_positions(sequence, peptide, index=index) == expected
+            assert index.count(peptide) == len(expected)
+
+
+def test_overlapping_occurrences():
+    index = SuffixArray('AAAAAAA')
+    assert index.find('AAAA').tolist() == [0, 1, 2, 3]
+    assert index.count('AAAAAAAA') == 0
+    assert SuffixArray('GKGKGKGK').find('GKGK').tolist() == [0, 2, 4]
+
+
+def test_locate_in_proteome():
+    proteome = sequences(seed=2)
+    index = SuffixArray(proteome)
+    rng = random.Random(3)
+    for sequence in proteome:
+        for peptide in patterns(sequence, rng):
+            expected = sorted((i, offset) for i, protein in enumerate(proteome)
+                              for offset in find_peptide_positions(protein, peptide))
+            assert index.locate(peptide) == expected
+            assert index.count(peptide) == len(expected)
+
+
+def test_matches_do_not_span_sequences():
+    index = SuffixArray(['AAK', 'GAA', '', 'KG'])
+    assert index.locate('AKG') == []
+    assert index.locate('KG') == [(3, 0)]
+    assert index.locate('AA') == [(0, 0), (1, 1)]
+
+
+@pytest.mark.parametrize('indexed', ['', [], ['']],
+                         ids=['empty-sequence', 'no-sequences', 'one-empty'])
+def test_empty_text(indexed):
+    index = SuffixArray(indexed)
+    assert index.find('A').tolist() == []
+    assert index.count('A') == 0
+    assert index.locate('A') == []
+
+
+def test_empty_peptide_matches_every_position():
+    assert find_peptide_positions(UBIQUITIN, '', index=SuffixArray(UBIQUITIN)) == \
+        find_peptide_positions(UBIQUITIN, '')
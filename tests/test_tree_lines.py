@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+from digest_simulator.DigestionSimulator import DigestionSimulator
+from digest_simulator.tools import iter_tree_lines, write_lines, write_tree
+
+from .test_intervals import HEMOGLOBIN_BETA, UBIQUITIN, proteases
+
+
+ENGINES = {
+    'recursive': {'engine': 'tree'},
+    'breadth-first': {'engine': 'tree', 'traversal': 'breadth_first'},
+    'compact': {'engine': 'tree', 'compact': True},
+    'interval': {'engine': 'interval'},
+    'missed-cleavages': {'engine': 'interval', 'max_missed_cleavages': 1},
+}
+
+
+def simulator(sequence=UBIQUITIN, **options):
+    return DigestionSimulator(sequence, proteases('Trypsin', 'AspN'), use_cache=False,
+                              **options)
+
+
+def nodes(root):
+    stack = list(root.children)
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children)
+
+
+def aligned_positions(lines):
+    return [(len(line) - len(line.lstrip(' ')), line.strip()) for line in lines]
+
+
+@pytest.mark.parametrize('options', ENGINES.values(), ids=ENGINES.keys())
+@pytest.mark.parametrize('start_line, max_lines', [(0, None), (0, 1), (3, 5), (10, 0),
+                                                   (5, None), (10**6, 3)])
+def test_pagination(options, start_line, max_lines):
+    digest = simulator(**options)
+    lines = list(digest.iter_tree_lines())
+    stop = None if max_lines is None else start_line + max_lines
+    page = list(digest.iter_tree_lines(start_line=start_line, max_lines=max_lines))
+    assert page == lines[start_line:stop]
+
+    stream = io.StringIO()
+    assert digest.write_tree(stream, start_line=start_line, max_lines=max_lines) == len(page)
+    assert stream.getvalue() == ''.join(line + '\n' for line in page)
+
+
+@pytest.mark.parametrize('options', ENGINES.values(), ids=ENGINES.keys())
+def test_lines_are_aligned(options):
+    digest = simulator(HEMOGLOBIN_BETA, **options)
+    lines = list(digest.iter_tree_lines())
+    assert lines[0] == HEMOGLOBIN_BETA
+    assert all(len(line) == len(HEMOGLOBIN_BETA) for line in lines)
+    for start, peptide in aligned_positions(lines):
+        assert HEMOGLOBIN_BETA[start:start + len(peptide)] == peptide
+
+
+@pytest.mark.parametrize('options', [ENGINES['recursive'], ENGINES['compact']],
+                         ids=['recursive', 'compact'])
+@pytest.mark.parametrize('order', ['depth_first', 'breadth_first'])
+def test_every_node_once_at_its_start(options, order):
+    digest = simulator(HEMOGLOBIN_BETA, **options)
+    lines = list(iter_tree_lines(digest.root, HEMOGLOBIN_BETA, order=order))
+    expected = sorted((node.start, node.peptide) for node in nodes(digest.root))
+    assert len(lines) == len(expected) + 1
+    assert sorted(aligned_positions(lines[1:])) == expected
+
+
+def test_write_tree_matches_lines():
+    digest = simulator()
+    stream = io.StringIO()
+    n_lines = write_tree(digest.root, UBIQUITIN, stream, order='breadth_first', start_line=2,
+                         max_lines=4)
+    assert n_lines == 4
+    assert stream.getvalue().splitlines() == \
+        list(iter_tree_lines(digest.root, UBIQUITIN, order='breadth_first'))[2:6]
+
+
+def test_write_lines():
+    stream = io.StringIO()
+    assert write_lines(iter(['a', '', 'b']), stream) == 3
+    assert stream.getvalue() == 'a\n\nb\n'
+    assert write_lines([], stream) == 0